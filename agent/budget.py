@@ -0,0 +1,46 @@
+import math
+import time
+from typing import List, Optional
+
+
+class Deadline:
+    """Execution budget for one run, measured on the monotonic clock.
+
+    Network calls derive their timeouts from the remaining time, and optional
+    stages ask allows() before starting so they can be dropped when the
+    budget is tight.
+    """
+
+    MIN_TIMEOUT = 0.1
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left in the budget (infinite when unbounded)."""
+        if self.expires_at is None:
+            return math.inf
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float, reserve: float = 0.0) -> float:
+        """Per-call timeout: the cap, shortened to fit the remaining budget minus reserve."""
+        return max(min(cap, self.remaining() - reserve), self.MIN_TIMEOUT)
+
+    def allows(self, needed: float, reserve: float = 0.0) -> bool:
+        """Whether a stage needing this many seconds fits, keeping reserve spare."""
+        return self.remaining() - reserve >= needed
+
+    def skip(self, stage: str):
+        """Record that an optional stage was dropped to stay within budget."""
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+
+# Unbounded deadline used when a caller does not supply one
+NO_DEADLINE = Deadline()
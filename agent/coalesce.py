@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+
+class _Call:
+    """One in-flight execution that followers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Collapse concurrent or near-duplicate calls with the same key into one execution.
+
+    While a call for a key is running, later callers wait for it and receive
+    the same result. A finished result is also kept for window_seconds so
+    triggers arriving just after completion are deduplicated too; results
+    rejected by keep_result (e.g. failed runs) are not kept, so a retry runs.
+    """
+
+    def __init__(self, window_seconds: float = 60.0,
+                 keep_result: Optional[Callable[[Any], bool]] = None):
+        self.window_seconds = window_seconds
+        self.keep_result = keep_result
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, _Call] = {}
+        self._recent: Dict[Hashable, Tuple[float, Any]] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn once per key; returns (result, shared) where shared means another trigger ran it."""
+        with self._lock:
+            self._evict(time.monotonic())
+            if key in self._recent:
+                return self._recent[key][1], True
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None and (self.keep_result is None or self.keep_result(call.result)):
+                    self._recent[key] = (time.monotonic(), call.result)
+            call.done.set()
+        return call.result, False
+
+    def _evict(self, now: float):
+        expired = [k for k, (finished, _) in self._recent.items() if now - finished > self.window_seconds]
+        for k in expired:
+            del self._recent[k]
+
+
+def coalescing_key(cities: Iterable[str], scope: Hashable = None) -> Hashable:
+    """Key identifying equivalent triggers: the same set of cities and scope (e.g. recipients and stages).
+
+    The key carries no time slot; SingleFlight's window, measured from when
+    the run finished, decides how long duplicates share its result.
+    """
+    return ('cities', frozenset(c.strip().lower() for c in cities), scope)
+
+
+class StaleWhileRevalidate:
+    """Per-key value cache that keeps serving expired values while refreshing them.
+
+    A value is fresh for ttl_seconds. For max_stale_seconds after that it is
+    still returned, and one background refresh per key replaces it, so
+    callers never wait on the refresh; only values older than both go
+    missing. Refreshed values rejected by keep (e.g. errors) are dropped and
+    the stale one stays until it ages out.
+    """
+
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float = 0.0,
+                 keep: Optional[Callable[[Any], bool]] = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.keep = keep
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._refreshing: Set[Hashable] = set()
+
+    def get(self, key: Hashable, refresh: Optional[Callable[[], Any]] = None) -> Tuple[Any, str]:
+        """Return (value, status): status is 'fresh', 'stale' or 'miss' (value None).
+
+        A stale value starts refresh in a background thread unless one is
+        already running for the key.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stored = self._values.get(key)
+            if stored is None:
+                return None, 'miss'
+            age = now - stored[0]
+            if age <= self.ttl_seconds:
+                return stored[1], 'fresh'
+            if age > self.ttl_seconds + self.max_stale_seconds:
+                del self._values[key]
+                return None, 'miss'
+            start = refresh is not None and key not in self._refreshing
+            if start:
+                self._refreshing.add(key)
+        if start:
+            threading.Thread(target=self._refresh, args=(key, refresh), daemon=True).start()
+        return stored[1], 'stale'
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value if keep accepts it."""
+        if self.keep is None or self.keep(value):
+            with self._lock:
+                self._values[key] = (time.monotonic(), value)
+
+    def _refresh(self, key: Hashable, refresh: Callable[[], Any]):
+        try:
+            self.put(key, refresh())
+        except Exception as e:
+            self.logger.warning(f"Background refresh of {key!r} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
@@ -1,18 +1,55 @@
 import logging
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Dict, Any, Optional
-from openai import OpenAI
+from typing import Dict, Any, Callable, Iterable, List, Optional, Set, Tuple
 from agent.tools import WeatherTools
+from agent.metrics import RunMetrics, NULL_METRICS, export_metrics
+from agent.budget import Deadline, NO_DEADLINE
+from agent.coalesce import StaleWhileRevalidate
+from agent.llm import Completion, ModelBackend, get_model_backend
+from agent.profiling import RunProfiler
+from agent.sharding import shard_cities, run_shards, merge_shard_results
+from agent.tenants import Tenant, load_registry
+from agent.report import CityReport
+from agent.templates import template_engine
+from agent.units import convert_weather
 from config.settings import settings
 
+# Stages a batch run can execute, in order
+RUN_STAGES = ('fetch', 'insights', 'email')
+
+# Why a city has no insights; reported in results, never put in emails
+INSIGHTS_FAILED = "Unable to generate AI insights at this time."
+INSIGHTS_SKIPPED = "AI insights skipped to stay within the run time budget."
+
+# (insights, error): exactly one is set
+InsightsResult = Tuple[Optional[str], Optional[str]]
+
 
 class WeatherMonitorAgent:
     """AI-powered weather monitoring agent that sends daily weather reports."""
     
     def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
+        self._model: Optional[ModelBackend] = None
         self.weather_tools = WeatherTools()
         self.setup_logging()
+        # Loaded once and reused by every run in this process
+        self.tenants = load_registry(settings.tenant_registry) if settings.tenant_registry else None
+        self.insights_cache = (
+            StaleWhileRevalidate(settings.insights_cache_ttl_seconds, settings.cache_max_stale_seconds)
+            if settings.insights_cache_ttl_seconds > 0 else None
+        )
+    
+    @property
+    def model(self) -> ModelBackend:
+        """The configured model backend (llm_backend), created on first use.
+        
+        Raises:
+            ValueError: If the backend is unknown or its settings are missing
+        """
+        if self._model is None:
+            self._model = get_model_backend()
+        return self._model
     
     def setup_logging(self):
         """Setup logging configuration."""
@@ -22,71 +59,538 @@ class WeatherMonitorAgent:
         )
         self.logger = logging.getLogger(__name__)
     
-    def generate_weather_insights(self, weather_data: Dict[str, Any]) -> str:
-        """Generate AI-powered insights about the weather data."""
+    def build_insights_prompt(self, weather_data: Dict[str, Any], tenant: Optional[Tenant] = None,
+                              base: Optional[str] = None) -> str:
+        """Build the user prompt sent to the model for a weather observation.
+        
+        base is an already rendered prompt (e.g. CityReport.prompt) to use
+        instead of rendering one. A tenant's insight mode and language
+        shorten or translate the answer.
+        """
+        prompt = base or template_engine.render_prompt(template_engine.build_context(weather_data))
+        if tenant is None:
+            return prompt
+        if tenant.insight_mode == 'brief':
+            prompt = prompt.split("Provide:")[0] + "Provide a two-sentence summary with one recommendation for the day.\n"
+        if tenant.language != 'en':
+            prompt += f"\nRespond in the language with ISO 639-1 code '{tenant.language}'.\n"
+        return prompt
+    
+    def generate_weather_insights(self, weather_data: Dict[str, Any],
+                                  metrics: RunMetrics = NULL_METRICS,
+                                  deadline: Deadline = NO_DEADLINE,
+                                  reserve: float = 0.0,
+                                  tenant: Optional[Tenant] = None,
+                                  prompt: Optional[str] = None) -> str:
+        """Generate AI-powered insights about the weather data.
+        
+        Returns the insights, or a status message saying why there are none;
+        use insights_for() to tell the two apart.
+        """
+        insights, error = self.insights_for(weather_data, metrics, deadline, reserve, tenant, prompt)
+        return insights if insights is not None else error
+    
+    def insights_for(self, weather_data: Dict[str, Any],
+                     metrics: RunMetrics = NULL_METRICS,
+                     deadline: Deadline = NO_DEADLINE,
+                     reserve: float = 0.0,
+                     tenant: Optional[Tenant] = None,
+                     prompt: Optional[str] = None) -> InsightsResult:
+        """Insights for an observation as (insights, error); exactly one is set.
+        
+        Insights are optional: they are skipped when the remaining budget,
+        less any time reserved for later stages, cannot cover them, and a
+        failed model call yields an error instead. A tenant may supply its
+        own system prompt, language and insight mode; prompt is a
+        pre-rendered base prompt (see build_insights_prompt).
+        
+        With insights_cache_ttl_seconds set, insights are reused per city and
+        tenant profile; expired ones are served for up to
+        cache_max_stale_seconds while a background call refreshes them.
+        """
         if 'error' in weather_data:
-            return f"Unable to generate insights due to weather data error: {weather_data['error']}"
-        
-        prompt = f"""
-        As a weather expert, analyze this weather data and provide helpful insights:
-        
-        City: {weather_data['city']}, {weather_data['country']}
-        Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
-        Conditions: {weather_data['description']}
-        Humidity: {weather_data['humidity']}%
-        Wind: {weather_data['wind_speed']} m/s
-        Pressure: {weather_data['pressure']} hPa
-        Sunrise: {weather_data['sunrise']}
-        Sunset: {weather_data['sunset']}
-        
-        Provide:
-        1. A brief weather summary
-        2. Any notable weather patterns
-        3. Recommendations for the day (clothing, activities, etc.)
-        4. Any weather alerts or warnings if applicable
-        
-        Keep it concise and friendly.
+            return None, f"Unable to generate insights due to weather data error: {weather_data['error']}"
+        return self._generate([weather_data], metrics, deadline, reserve, tenant, prompt)[0]
+    
+    def insights_request(self, weather_data: Dict[str, Any], tenant: Optional[Tenant] = None,
+                         prompt: Optional[str] = None) -> Completion:
+        """The model backend request for an observation.
+        
+        Tenant and city overrides may change the model, prompt or sampling
+        settings; a registry tenant's own system_prompt wins over both. A
+        tenant's prompt shows the observation in the tenant's units.
+        """
+        location = f"{weather_data['city']},{weather_data['country']}"
+        if tenant is not None:
+            weather_data = convert_weather(weather_data, tenant.units)
+        config = settings.resolve(tenant=tenant and tenant.tenant_id, location=location)
+        return {
+            'model': config.model_name,
+            'system': (tenant and tenant.system_prompt) or config.system_prompt,
+            'prompt': self.build_insights_prompt(weather_data, tenant, prompt),
+            'temperature': config.temperature,
+            'max_tokens': config.max_tokens,
+            'timeout': config.llm_timeout_seconds,
+            'weather': weather_data,
+        }
+    
+    def insight_profile(self, tenant: Optional[Tenant]) -> Optional[tuple]:
+        """Key under which tenants share insights: the registry profile plus its TENANT_OVERRIDES."""
+        if tenant is None:
+            return None
+        return tenant.insight_profile(), tuple(sorted(settings.overrides(tenant=tenant.tenant_id).items()))
+    
+    def _generate(self, weather_list: List[Dict[str, Any]], metrics: RunMetrics, deadline: Deadline,
+                  reserve: float, tenant: Optional[Tenant] = None,
+                  prompt: Optional[str] = None) -> List[InsightsResult]:
+        """(insights, error) for error-free observations, in order.
+        
+        Cached insights are served first; the rest go to the model backend
+        in batches of its batch_size, checking the budget before each.
         """
+        results: List[InsightsResult] = [(None, INSIGHTS_SKIPPED)] * len(weather_list)
+        profile = self.insight_profile(tenant)
+        pending = []
+        for i, weather in enumerate(weather_list):
+            request = self.insights_request(weather, tenant, prompt)
+            cache_key = (f"{weather['city']},{weather['country']}".lower(), profile)
+            if self.insights_cache is not None:
+                cached, status = self.insights_cache.get(
+                    cache_key, lambda request=request: self.model.complete(request)
+                )
+                if cached is not None:
+                    metrics.record(f"insights_cache_{status}", 0.0)
+                    results[i] = (cached, None)
+                    continue
+            pending.append((i, cache_key, request))
+        if not pending:
+            return results
         
         try:
-            response = self.client.chat.completions.create(
-                model=settings.model_name,
-                messages=[
-                    {"role": "system", "content": settings.system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=settings.temperature,
-                max_tokens=settings.max_tokens
-            )
+            model = self.model
+        except ValueError as e:
+            # A misconfigured backend costs the insights, never the run
+            self.logger.error(f"AI insights unavailable: {str(e)}")
+            for i, _, _ in pending:
+                results[i] = (None, INSIGHTS_FAILED)
+            return results
+        
+        size = model.batch_size or len(pending)
+        for start in range(0, len(pending), size):
+            if not deadline.allows(settings.insights_min_seconds, reserve):
+                deadline.skip('insights')
+                break
+            batch = pending[start:start + size]
+            try:
+                completions = model.complete_batch([r for _, _, r in batch], metrics, deadline, reserve)
+            except Exception as e:
+                completions = [e] * len(batch)
+            for (i, cache_key, _), completion in zip(batch, completions):
+                if isinstance(completion, Exception):
+                    self.logger.error(f"Failed to generate AI insights: {str(completion)}")
+                    results[i] = (None, INSIGHTS_FAILED)
+                    continue
+                results[i] = (completion, None)
+                if self.insights_cache is not None:
+                    self.insights_cache.put(cache_key, completion)
+        return results
+    
+    def generate_batch_insights(self, weather_by_location: Dict[str, Dict[str, Any]],
+                                metrics: RunMetrics = NULL_METRICS,
+                                deadline: Deadline = NO_DEADLINE,
+                                reserve: float = 0.0,
+                                tenant: Optional[Tenant] = None) -> Dict[str, str]:
+        """Generate insights keyed by requested location, batched through the model backend.
+        
+        Keys match weather_by_location's, so same-named cities in different
+        countries stay apart. Cities without insights (failed, or reached
+        after the budget ran short) are left out; see batch_insights().
+        """
+        return self.batch_insights(weather_by_location, metrics, deadline, reserve, tenant)[0]
+    
+    def batch_insights(self, weather_by_location: Dict[str, Dict[str, Any]],
+                       metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE,
+                       reserve: float = 0.0,
+                       tenant: Optional[Tenant] = None) -> Tuple[Dict[str, str], Dict[str, str]]:
+        """(insights, errors) keyed by requested location; errors say why a city has none."""
+        locations = [loc for loc, w in weather_by_location.items() if 'error' not in w]
+        results = self._generate([weather_by_location[loc] for loc in locations],
+                                 metrics, deadline, reserve, tenant)
+        insights = {loc: text for loc, (text, _) in zip(locations, results) if text is not None}
+        errors = {loc: error for loc, (_, error) in zip(locations, results) if error is not None}
+        return insights, errors
+    
+    def run_daily_weather_check(self, deadline: Optional[Deadline] = None,
+                                profile: bool = False) -> Dict[str, Any]:
+        """Main function to run the daily weather check and send email.
+        
+        The run is bounded by deadline, defaulting to run_budget_seconds so it
+        finishes inside the Cloud Function timeout. With a tenant registry
+        configured, every tenant is served instead. profile (or the
+        profile_runs setting) attaches a CPU and memory profile to the result.
+        """
+        self.logger.info("Starting daily weather check...")
+        
+        if self.tenants is not None:
+            return self.run_tenants(deadline=deadline, profile=profile)
+        if settings.digest_mode:
+            return self._run_instrumented(self.run_digest_check, deadline, profile=profile)
+        return self._run_instrumented(self.run_single_check, deadline, profile=profile)
+    
+    def prewarm(self, cities: Optional[List[str]] = None,
+                deadline: Optional[Deadline] = None,
+                profile: bool = False) -> Dict[str, Any]:
+        """Fetch observations and generate insights ahead of a scheduled send, sending nothing.
+        
+        Covers the cities the daily run would (every tenant's with a
+        registry). Observations land in the HTTP cache and insights in the
+        insights cache, so the send itself is mostly rendering and delivery.
+        Insights are only kept with insights_cache_ttl_seconds set, which
+        should exceed prewarm_lead_seconds. Runs in-process: sharded sends
+        generate their own insights.
+        """
+        if self.insights_cache is None:
+            self.logger.warning("INSIGHTS_CACHE_TTL_SECONDS is 0; pre-warming observations only")
+        elif settings.insights_cache_ttl_seconds + settings.cache_max_stale_seconds < settings.prewarm_lead_seconds:
+            self.logger.warning("Pre-warmed insights expire before the send; raise INSIGHTS_CACHE_TTL_SECONDS "
+                                "above PREWARM_LEAD_SECONDS")
+        stages = ['fetch', 'insights'] if self.insights_cache is not None else ['fetch']
+        
+        self.logger.info("Pre-warming caches for the next scheduled send...")
+        if self.tenants is not None:
+            result = self.run_tenants(cities=cities, stages=stages, deadline=deadline, profile=profile)
+        else:
+            result = self.run_batch(cities=cities, stages=stages, deadline=deadline,
+                                    allow_sharding=False, profile=profile)
+        result['prewarm'] = True
+        return result
+    
+    def run_batch(self, cities: Optional[List[str]] = None, recipients: Optional[List[str]] = None,
+                  stages: Optional[Iterable[str]] = None,
+                  deadline: Optional[Deadline] = None,
+                  allow_sharding: bool = True,
+                  export_metrics: bool = True,
+                  profile: bool = False) -> Dict[str, Any]:
+        """Run selected stages for many cities and recipients as one batch.
+        
+        Cities and recipients default to the configured ones; stages is any
+        of 'fetch', 'insights' and 'email' (fetch always runs). All cities are
+        fetched in a single batch. A single city with digest mode off sends
+        the regular report to each recipient; otherwise each recipient gets
+        one digest.
+        
+        With shard_processes > 1 and at least shard_min_cities cities, fetch
+        and insights are spread across a process pool and emails are sent
+        once from the merged results.
+        """
+        stages = self._check_stages(stages)
+        # Missing model settings cost the insights (see _generate), not the run
+        settings.require(*(s for s in RUN_STAGES if s in stages and s != 'insights'),
+                         *([] if cities else ['location']),
+                         *(['recipient'] if 'email' in stages and not recipients else []))
+        cities = list(cities or settings.city_list())
+        recipients = list(recipients or [settings.email_recipient])
+        
+        self.logger.info(f"Starting batch run: {len(cities)} cities, {len(recipients)} recipients, "
+                         f"stages {', '.join(s for s in RUN_STAGES if s in stages)}")
+        sharded = (allow_sharding and settings.shard_processes > 1
+                   and len(cities) >= settings.shard_min_cities)
+        run_stages = self._run_sharded_stages if sharded else self._run_batch_stages
+        return self._run_instrumented(
+            lambda metrics, deadline: run_stages(cities, recipients, stages, metrics, deadline),
+            deadline,
+            export=export_metrics,
+            profile=profile
+        )
+    
+    def run_tenants(self, tenant_ids: Optional[List[str]] = None, cities: Optional[List[str]] = None,
+                    recipients: Optional[List[str]] = None,
+                    stages: Optional[Iterable[str]] = None,
+                    deadline: Optional[Deadline] = None,
+                    export_metrics: bool = True,
+                    profile: bool = False) -> Dict[str, Any]:
+        """Run selected stages for tenants from the registry as one batch.
+        
+        Tenants default to all of them, or those following the given cities
+        or sending to the given recipients; cities and recipients also narrow
+        each tenant's digest. Every location is fetched once, tenants with the
+        same language, insight mode, prompt and units share one batch of
+        insights, and every tenant's digests (in the tenant's units) go out
+        as one delivery batch.
+        
+        Raises:
+            ValueError: If no registry is configured, a tenant or stage is
+                unknown, or required settings are missing
+        """
+        if self.tenants is None:
+            raise ValueError("No tenant registry configured (set TENANT_REGISTRY)")
+        stages = self._check_stages(stages)
+        settings.require(*(s for s in RUN_STAGES if s in stages and s != 'insights'))
+        selected = self.tenants.select(tenant_ids, cities, recipients)
+        
+        self.logger.info(f"Starting tenant run: {len(selected)} of {len(self.tenants)} tenants, "
+                         f"stages {', '.join(s for s in RUN_STAGES if s in stages)}")
+        return self._run_instrumented(
+            lambda metrics, deadline: self._run_tenant_stages(selected, stages, metrics, deadline),
+            deadline,
+            export=export_metrics,
+            profile=profile
+        )
+    
+    def _check_stages(self, stages: Optional[Iterable[str]]) -> Set[str]:
+        """Requested stages, validated; fetch always runs."""
+        requested = set(stages or RUN_STAGES) | {'fetch'}
+        unknown = requested - set(RUN_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        return requested
+    
+    def _run_tenant_stages(self, tenants: List[Tenant], stages: Set[str],
+                           metrics: RunMetrics, deadline: Deadline) -> Dict[str, Any]:
+        try:
+            locations = list(dict.fromkeys(city for tenant in tenants for city in tenant.cities))
+            weather_by_location = self.weather_tools.get_weather_for_cities(locations, metrics, deadline)
             
-            return response.choices[0].message.content
+            tenant_insights: Dict[str, Dict[str, str]] = {}
+            tenant_errors: Dict[str, Dict[str, str]] = {}
+            if 'insights' in stages:
+                reserve = settings.email_reserve_seconds if 'email' in stages else 0.0
+                # One batched call per insight profile, over the union of its tenants' cities
+                profiles: Dict[tuple, List[Tenant]] = {}
+                for tenant in tenants:
+                    if tenant.insight_mode != 'off':
+                        profiles.setdefault(self.insight_profile(tenant), []).append(tenant)
+                for group in profiles.values():
+                    locations = dict.fromkeys(loc for tenant in group for loc in tenant.cities)
+                    insights, errors = self.batch_insights({loc: weather_by_location[loc] for loc in locations},
+                                                           metrics, deadline, reserve, group[0])
+                    for tenant in group:
+                        tenant_insights[tenant.tenant_id] = {loc: insights[loc] for loc in tenant.cities
+                                                             if loc in insights}
+                        tenant_errors[tenant.tenant_id] = {loc: errors[loc] for loc in tenant.cities
+                                                           if loc in errors}
+            
+            # Every tenant's digests go out as one delivery batch
+            tenant_emails: List[Dict[str, Dict[str, Any]]] = [{} for _ in tenants]
+            if 'email' in stages:
+                tenant_emails = self.weather_tools.send_digest_groups(
+                    [({recipient: tenant.cities for recipient in tenant.recipients},
+                      tenant_insights.get(tenant.tenant_id, {}), tenant.units) for tenant in tenants],
+                    weather_by_location, metrics, deadline
+                )
+            
+            results = {}
+            for tenant, email_results in zip(tenants, tenant_emails):
+                for recipient, email_result in email_results.items():
+                    if not email_result['success']:
+                        self.logger.error(f"Failed to send digest for tenant {tenant.tenant_id} "
+                                          f"to {recipient}: {email_result['error']}")
+                results[tenant.tenant_id] = {
+                    'ai_insights': tenant_insights.get(tenant.tenant_id, {}),
+                    'ai_insights_errors': tenant_errors.get(tenant.tenant_id, {}),
+                    'email_results': email_results,
+                }
+            
+            if 'email' in stages:
+                success = all(r['success'] for t in results.values() for r in t['email_results'].values())
+            else:
+                success = any('error' not in w for w in weather_by_location.values())
+            
+            return {
+                'success': success,
+                'stages': [s for s in RUN_STAGES if s in stages],
+                'weather_data': weather_by_location,
+                'tenants': results,
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
             
         except Exception as e:
-            self.logger.error(f"Failed to generate AI insights: {str(e)}")
-            return "Unable to generate AI insights at this time."
+            self.logger.error(f"Error in tenant run: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
     
-    def run_daily_weather_check(self) -> Dict[str, Any]:
-        """Main function to run the daily weather check and send email."""
-        self.logger.info("Starting daily weather check...")
+    def _run_batch_stages(self, cities: List[str], recipients: List[str], stages: Set[str],
+                          metrics: RunMetrics, deadline: Deadline) -> Dict[str, Any]:
+        try:
+            weather_by_location = self.weather_tools.get_weather_for_cities(cities, metrics, deadline)
+            
+            insights, insight_errors = {}, {}
+            if 'insights' in stages:
+                reserve = settings.email_reserve_seconds if 'email' in stages else 0.0
+                insights, insight_errors = self.batch_insights(weather_by_location, metrics, deadline, reserve)
+            
+            return self._finish_batch(cities, recipients, stages, weather_by_location, insights, insight_errors,
+                                      metrics, deadline)
+            
+        except Exception as e:
+            self.logger.error(f"Error in batch run: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+    
+    def _run_sharded_stages(self, cities: List[str], recipients: List[str], stages: Set[str],
+                            metrics: RunMetrics, deadline: Deadline) -> Dict[str, Any]:
+        try:
+            shards = shard_cities(cities, settings.shard_processes)
+            self.logger.info(f"Running {len(cities)} cities across {len(shards)} shard processes")
+            
+            # Shards fetch and generate insights; email is sent once from the merged view
+            shard_stages = [s for s in stages if s != 'email']
+            budget = None if deadline.budget is None else deadline.remaining()
+            if 'email' in stages and budget is not None:
+                budget -= settings.email_reserve_seconds
+            with metrics.span('shards'):
+                results = run_shards(shards, recipients, shard_stages, settings.shard_processes, budget)
+            
+            for result in results:
+                metrics.merge(result.get('metrics', {}), rename={'total': 'shard_total'})
+            merged = merge_shard_results(results)
+            for stage in merged['skipped_stages']:
+                deadline.skip(stage)
+            for error in merged['errors']:
+                self.logger.error(f"Shard failed: {error}")
+            
+            result = self._finish_batch(cities, recipients, stages, merged['weather_data'],
+                                        merged['ai_insights'], merged['ai_insights_errors'], metrics, deadline)
+            result['shards'] = len(results)
+            if merged['errors']:
+                result['success'] = False
+                result['shard_errors'] = merged['errors']
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Error in sharded batch run: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+    
+    def _finish_batch(self, cities: List[str], recipients: List[str], stages: Set[str],
+                      weather_by_location: Dict[str, Dict[str, Any]], insights: Dict[str, str],
+                      insight_errors: Dict[str, str],
+                      metrics: RunMetrics, deadline: Deadline) -> Dict[str, Any]:
+        """Send the batch's emails if requested and assemble the batch result."""
+        email_results = {}
+        if 'email' in stages:
+            if len(cities) == 1 and not settings.digest_mode:
+                report = CityReport(weather_by_location[cities[0]], insights.get(cities[0]))
+                email_results = self.weather_tools.send_report_emails(report, recipients, metrics, deadline)
+            else:
+                email_results = self.weather_tools.send_digests(
+                    {recipient: cities for recipient in recipients},
+                    weather_by_location=weather_by_location,
+                    insights=insights,
+                    metrics=metrics,
+                    deadline=deadline
+                )
+            for recipient, email_result in email_results.items():
+                if not email_result['success']:
+                    self.logger.error(f"Failed to send weather email to {recipient}: {email_result['error']}")
+            success = all(r['success'] for r in email_results.values())
+        else:
+            success = any('error' not in w for w in weather_by_location.values())
+        
+        return {
+            'success': success,
+            'stages': [s for s in RUN_STAGES if s in stages],
+            'weather_data': weather_by_location,
+            'ai_insights': insights,
+            'ai_insights_errors': insight_errors,
+            'email_results': email_results,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def _run_instrumented(self, run: Callable[[RunMetrics, Deadline], Dict[str, Any]],
+                          deadline: Optional[Deadline] = None,
+                          export: bool = True,
+                          profile: bool = False) -> Dict[str, Any]:
+        """Execute a run under a deadline with metrics collection and export.
+        
+        With profile or profile_runs set, the run is profiled and the summary
+        is attached as result['profile'].
+        """
+        if deadline is None:
+            deadline = Deadline(settings.run_budget_seconds)
         
+        metrics = RunMetrics()
+        profiler = (
+            RunProfiler(settings.profile_top, settings.profile_dir)
+            if profile or settings.profile_runs else None
+        )
+        with profiler or nullcontext(), metrics.span('total'):
+            result = run(metrics, deadline)
+            # Queued emails go out in batches here unless a background sender
+            # runs; failures stay queued for the next run
+            try:
+                outbox = self.weather_tools.flush_outbox(metrics, deadline)
+                if outbox is not None:
+                    result['outbox'] = outbox
+            except Exception as e:
+                self.logger.error(f"Outbox drain failed: {str(e)}")
+        
+        if deadline.skipped:
+            self.logger.warning(f"Skipped stages to stay within budget: {', '.join(deadline.skipped)}")
+        result['skipped_stages'] = list(deadline.skipped)
+        if profiler is not None:
+            # A profiling failure costs the profile, not the run
+            try:
+                result['profile'] = profiler.summary()
+            except Exception as e:
+                self.logger.warning(f"Failed to summarize run profile: {str(e)}")
+        
+        # Per-stage timings travel with the result and to the configured exporter
+        result['metrics'] = metrics.summary()
+        if not export:
+            return result
+        try:
+            export_metrics(metrics, settings.metrics_format, settings.metrics_textfile,
+                           success=result['success'])
+        except OSError as e:
+            self.logger.warning(f"Failed to export run metrics: {str(e)}")
+        return result
+    
+    def run_single_check(self, metrics: RunMetrics = NULL_METRICS,
+                         deadline: Deadline = NO_DEADLINE) -> Dict[str, Any]:
+        """Fetch weather for the configured city and email it with AI insights embedded.
+        
+        One CityReport is built for the city; its context feeds both the
+        insights prompt and the email, which is rendered once with the
+        insights included.
+        """
         try:
-            # Get weather data and send email
-            result = self.weather_tools.get_weather_and_send_email()
+            # Missing model settings cost the insights, not the email
+            settings.require('fetch', 'email', 'location', 'recipient')
+            
+            report = CityReport(self.weather_tools.get_current_weather(metrics=metrics, deadline=deadline))
             
-            # Generate AI insights
-            insights = self.generate_weather_insights(result['weather_data'])
+            # Insights run before delivery, so keep time in reserve for the email;
+            # without them the email simply has no insights section
+            report.insights, insights_error = self.insights_for(
+                report.weather, metrics, deadline, settings.email_reserve_seconds,
+                prompt=report.prompt if report.ok else None
+            )
+            email_result = self.weather_tools.send_report_emails(
+                report, [settings.email_recipient], metrics, deadline
+            )[settings.email_recipient]
             
-            # Log results
-            if result['email_result']['success']:
-                self.logger.info(f"Weather email sent successfully: {result['email_result']['message']}")
+            if email_result['success']:
+                self.logger.info(f"Weather email sent successfully: {email_result['message']}")
             else:
-                self.logger.error(f"Failed to send weather email: {result['email_result']['error']}")
+                self.logger.error(f"Failed to send weather email: {email_result['error']}")
             
             return {
-                'success': result['email_result']['success'],
-                'weather_data': result['weather_data'],
-                'email_result': result['email_result'],
-                'ai_insights': insights,
+                'success': email_result['success'],
+                'weather_data': report.weather,
+                'email_result': email_result,
+                'ai_insights': report.insights,
+                'ai_insights_error': insights_error,
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
             
@@ -98,11 +602,66 @@ class WeatherMonitorAgent:
                 'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             }
     
+    def run_digest_check(self, metrics: RunMetrics = NULL_METRICS,
+                         deadline: Deadline = NO_DEADLINE) -> Dict[str, Any]:
+        """Send one digest email covering every configured city."""
+        try:
+            settings.require('fetch', 'email', 'location', 'recipient')
+            locations = settings.city_list()
+            weather_by_location = self.weather_tools.get_weather_for_cities(locations, metrics, deadline)
+            
+            # Insights run before delivery here, so keep time in reserve for the email
+            insights, insight_errors = self.batch_insights(
+                weather_by_location, metrics, deadline, settings.email_reserve_seconds
+            )
+            
+            email_result = self.weather_tools.send_digests(
+                {settings.email_recipient: locations},
+                weather_by_location=weather_by_location,
+                insights=insights,
+                metrics=metrics,
+                deadline=deadline
+            )[settings.email_recipient]
+            
+            if email_result['success']:
+                self.logger.info(f"Weather digest sent successfully: {email_result['message']}")
+            else:
+                self.logger.error(f"Failed to send weather digest: {email_result['error']}")
+            
+            return {
+                'success': email_result['success'],
+                'weather_data': list(weather_by_location.values()),
+                'email_result': email_result,
+                'ai_insights': insights,
+                'ai_insights_errors': insight_errors,
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error in weather digest: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            }
+    
     def get_weather_only(self) -> Dict[str, Any]:
         """Get weather data without sending email (for testing)."""
+        missing = settings.missing_for('fetch', 'location')
+        if missing:
+            return {'error': f"Missing configuration: {', '.join(missing)}"}
         return self.weather_tools.get_current_weather()
     
     def send_test_email(self) -> Dict[str, Any]:
-        """Send a test email with current weather data."""
-        weather_data = self.get_weather_only()
-        return self.weather_tools.send_weather_email(weather_data) 
\ No newline at end of file
+        """Send a test email with current weather data.
+        
+        The email is delivered directly, bypassing any outbox, so the result
+        reflects whether the delivery settings work.
+        """
+        missing = settings.missing_for('fetch', 'email', 'location', 'recipient')
+        if missing:
+            return {'success': False, 'error': f"Missing configuration: {', '.join(missing)}"}
+        message = CityReport(self.get_weather_only()).message(settings.email_recipient)
+        return self.weather_tools.send_messages(
+            [(message, "Test email")], queue=False
+        )[settings.email_recipient] 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import json
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import msgspec
+except ImportError:  # Optional fast path
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:  # Optional fast path
+    orjson = None
+
+
+if msgspec is not None:
+    # Only the fields parse_weather reads; everything else in the payload is skipped.
+    # Numbers keep their JSON int/float type so formatting matches the stdlib path.
+    Number = Union[int, float]
+
+    class _Main(msgspec.Struct):
+        temp: Number
+        feels_like: Number
+        humidity: Number
+        pressure: Number
+
+    class _Sys(msgspec.Struct):
+        country: str
+        sunrise: int
+        sunset: int
+
+    class _Condition(msgspec.Struct):
+        description: str
+
+    class _Wind(msgspec.Struct):
+        speed: Number
+        deg: Optional[Number] = None
+
+    class _WeatherPayload(msgspec.Struct):
+        name: str
+        main: _Main
+        sys: _Sys
+        weather: List[_Condition]
+        wind: _Wind
+        visibility: Optional[Number] = None
+        timezone: int = 0
+
+    _msgspec_decoder = msgspec.json.Decoder(_WeatherPayload)
+
+    def _decode_msgspec(content: bytes) -> Dict[str, Any]:
+        try:
+            p = _msgspec_decoder.decode(content)
+        except msgspec.MsgspecError as e:
+            raise ValueError(str(e)) from e
+        wind = {'speed': p.wind.speed}
+        if p.wind.deg is not None:
+            wind['deg'] = p.wind.deg
+        payload = {
+            'name': p.name,
+            'main': {
+                'temp': p.main.temp,
+                'feels_like': p.main.feels_like,
+                'humidity': p.main.humidity,
+                'pressure': p.main.pressure,
+            },
+            'sys': {'country': p.sys.country, 'sunrise': p.sys.sunrise, 'sunset': p.sys.sunset},
+            'weather': [{'description': c.description} for c in p.weather[:1]],
+            'wind': wind,
+            'timezone': p.timezone,
+        }
+        if p.visibility is not None:
+            payload['visibility'] = p.visibility
+        return payload
+
+
+def _decode_orjson(content: bytes) -> Dict[str, Any]:
+    # orjson.JSONDecodeError subclasses ValueError
+    return orjson.loads(content)
+
+
+def _decode_stdlib(content: bytes) -> Dict[str, Any]:
+    return json.loads(content)
+
+
+DECODERS: Dict[str, Callable[[bytes], Dict[str, Any]]] = {'json': _decode_stdlib}
+if orjson is not None:
+    DECODERS['orjson'] = _decode_orjson
+if msgspec is not None:
+    DECODERS['msgspec'] = _decode_msgspec
+
+
+def get_weather_decoder(name: str = 'auto') -> Callable[[bytes], Dict[str, Any]]:
+    """Return the weather payload decoder by name, or the fastest installed for 'auto'.
+
+    Every decoder returns the OpenWeather payload shape consumed by
+    WeatherTools.parse_weather and raises ValueError on malformed input.
+    """
+    if name == 'auto':
+        for candidate in ('msgspec', 'orjson', 'json'):
+            if candidate in DECODERS:
+                return DECODERS[candidate]
+    if name not in DECODERS:
+        raise ValueError(f"JSON decoder '{name}' is not available (installed: {', '.join(DECODERS)})")
+    return DECODERS[name]
@@ -0,0 +1,195 @@
+import json
+import smtplib
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config.settings import settings
+from agent.metrics import RunMetrics, NULL_METRICS
+from agent.budget import Deadline, NO_DEADLINE
+from agent.mime import SharedMessageEncoder
+
+# A rendered message: {'to': recipient, 'subject': ..., 'text': ..., 'html': ...}
+Message = Dict[str, str]
+
+
+class DeliveryBackend(ABC):
+    """Delivers rendered messages, a batch at a time.
+
+    send_batch returns one entry per message: None on success or the
+    exception that message failed with. Failures of individual messages do
+    not stop the batch; an exception raised by send_batch itself means none
+    of the batch was delivered.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def send_batch(self, messages: List[Message], metrics: RunMetrics = NULL_METRICS,
+                   deadline: Deadline = NO_DEADLINE) -> List[Optional[Exception]]:
+        """Deliver messages; one entry per message, None on success."""
+
+    def send(self, message: Message, metrics: RunMetrics = NULL_METRICS,
+             deadline: Deadline = NO_DEADLINE):
+        """Deliver one message, raising its error if it failed."""
+        error = self.send_batch([message], metrics, deadline)[0]
+        if error is not None:
+            raise error
+
+
+class SMTPBackend(DeliveryBackend):
+    """Email over SMTP, one authenticated session per batch."""
+
+    name = 'smtp'
+
+    def open(self, metrics: RunMetrics = NULL_METRICS,
+             deadline: Deadline = NO_DEADLINE) -> smtplib.SMTP:
+        """Connect and log in to the SMTP server."""
+        if deadline.expired:
+            raise TimeoutError("Run budget exhausted before email delivery")
+        with metrics.span('smtp_connect'):
+            server = smtplib.SMTP(
+                settings.smtp_server, settings.smtp_port,
+                timeout=deadline.timeout(settings.smtp_timeout_seconds)
+            )
+        with metrics.span('smtp_auth'):
+            if settings.smtp_use_tls:
+                server.starttls()
+            server.login(settings.email_sender, settings.email_password)
+        return server
+
+    def send_batch(self, messages: List[Message], metrics: RunMetrics = NULL_METRICS,
+                   deadline: Deadline = NO_DEADLINE) -> List[Optional[Exception]]:
+        """Send every message over one session; a dropped connection fails the remainder.
+
+        Recipients of the same report share its encoded bytes; only the To
+        header differs per message.
+        """
+        encoder = SharedMessageEncoder(settings.email_sender)
+        texts: List[Optional[bytes]] = []
+        encode_errors: List[Optional[Exception]] = []
+        with metrics.span('mime_build'):
+            for message in messages:
+                try:
+                    texts.append(encoder.encode(message))
+                    encode_errors.append(None)
+                except ValueError as e:
+                    texts.append(None)
+                    encode_errors.append(e)
+        if all(text is None for text in texts):
+            return encode_errors
+        server = self.open(metrics, deadline)
+        errors: List[Optional[Exception]] = []
+        try:
+            for message, text, error in zip(messages, texts, encode_errors):
+                if error is not None:
+                    errors.append(error)
+                    continue
+                try:
+                    with metrics.span('smtp_send'):
+                        server.sendmail(settings.email_sender, message['to'], text)
+                    errors.append(None)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    errors.append(e)
+                except OSError as e:
+                    errors.extend([e] * (len(messages) - len(errors)))
+                    break
+        finally:
+            try:
+                server.quit()
+            except OSError:
+                pass
+        return errors
+
+
+class WebhookBackend(DeliveryBackend):
+    """JSON POSTs to a Slack/Teams-style incoming webhook over pooled keep-alive connections.
+
+    The payload's "text" carries the subject and plain-text body; the
+    recipient is included so one endpoint can route many subscribers.
+    """
+
+    name = 'webhook'
+
+    def __init__(self, url: str, concurrency: int = 8):
+        self.url = url
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def payload(self, message: Message) -> Dict[str, str]:
+        return {
+            'text': f"*{message['subject']}*\n{message['text']}",
+            'recipient': message['to'],
+        }
+
+    def _post(self, message: Message, metrics: RunMetrics, deadline: Deadline) -> Optional[Exception]:
+        try:
+            with metrics.span('webhook_post'):
+                response = self.session.post(
+                    self.url, json=self.payload(message),
+                    timeout=deadline.timeout(settings.http_timeout_seconds)
+                )
+                response.raise_for_status()
+            return None
+        except requests.RequestException as e:
+            return e
+
+    def send_batch(self, messages: List[Message], metrics: RunMetrics = NULL_METRICS,
+                   deadline: Deadline = NO_DEADLINE) -> List[Optional[Exception]]:
+        if deadline.expired:
+            raise TimeoutError("Run budget exhausted before webhook delivery")
+        if len(messages) == 1:
+            return [self._post(messages[0], metrics, deadline)]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(messages))) as pool:
+            return list(pool.map(lambda m: self._post(m, metrics, deadline), messages))
+
+
+class FileBackend(DeliveryBackend):
+    """Appends messages as JSON lines to a file, or to stdout for path '-'.
+
+    Useful for local runs, load tests and piping into other tools.
+    """
+
+    name = 'file'
+
+    def __init__(self, path: str = '-'):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[Message], metrics: RunMetrics = NULL_METRICS,
+                   deadline: Deadline = NO_DEADLINE) -> List[Optional[Exception]]:
+        lines = ''.join(json.dumps(m, ensure_ascii=False) + '\n' for m in messages)
+        with metrics.span('file_write'), self._lock:
+            if self.path == '-':
+                sys.stdout.write(lines)
+                sys.stdout.flush()
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(lines)
+        return [None] * len(messages)
+
+
+def get_delivery_backend(name: Optional[str] = None) -> DeliveryBackend:
+    """Build the configured delivery backend (smtp, webhook or file).
+
+    Raises:
+        ValueError: If the backend is unknown or its settings are missing
+    """
+    name = name or settings.delivery_backend
+    if name == 'smtp':
+        return SMTPBackend()
+    if name == 'webhook':
+        if not settings.webhook_url:
+            raise ValueError("The webhook delivery backend requires WEBHOOK_URL")
+        return WebhookBackend(settings.webhook_url, settings.webhook_concurrency)
+    if name == 'file':
+        return FileBackend(settings.delivery_file)
+    raise ValueError(f"Unknown delivery backend '{name}' (expected smtp, webhook or file)")
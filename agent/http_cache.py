@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Set, Tuple
+
+import requests
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+_MUST_REVALIDATE = re.compile(r'no-cache|must-revalidate')
+
+
+class HTTPCache:
+    """Disk-backed HTTP response cache honoring Cache-Control, Expires and validators.
+
+    Fresh responses are served without a request. Stale ones are revalidated
+    with If-None-Match / If-Modified-Since, so an unchanged upstream answers
+    with a bodyless 304. Responses without freshness headers stay fresh for
+    default_ttl seconds. Entries are also kept in memory so a long-lived
+    process avoids re-reading disk.
+
+    With max_stale > 0, an entry that expired less than max_stale seconds
+    ago is served at once while a background thread revalidates it
+    (stale-while-revalidate).
+    """
+
+    def __init__(self, directory: str, default_ttl: float = 600.0, max_stale: float = 0.0):
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self._memory: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._revalidating: Set[str] = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, url: str, params: Dict[str, Any]) -> str:
+        """Cache key for a request; hashed so no query values (API keys) reach the filesystem."""
+        canonical = url + '?' + '&'.join(f"{k}={params[k]}" for k in sorted(params))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached entry (metadata plus 'body'), or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            return entry
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = f.read()
+        except (OSError, ValueError):
+            return None
+        self._memory[key] = entry
+        return entry
+
+    def store(self, key: str, entry: Dict[str, Any]):
+        """Persist an entry atomically (body first, then metadata)."""
+        self._memory[key] = entry
+        meta_path, body_path = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        try:
+            with self._lock:
+                self._write_atomic(body_path, entry['body'])
+                self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError:
+            # A read-only or full disk only costs us the cross-process cache
+            pass
+
+    def _write_atomic(self, path: str, data: bytes):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def freshness(self, headers) -> Optional[float]:
+        """Absolute expiry time from response headers; None means do not store."""
+        cache_control = headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            return None
+        now = time.time()
+        if 'no-cache' in cache_control:
+            return now
+        match = _MAX_AGE.search(cache_control)
+        if match:
+            age = float(headers.get('Age', 0) or 0)
+            return now + int(match.group(1)) - age
+        if headers.get('Expires'):
+            try:
+                return parsedate_to_datetime(headers['Expires']).timestamp()
+            except (TypeError, ValueError):
+                return now
+        return now + self.default_ttl
+
+    def fetch(self, session: requests.Session, url: str, params: Dict[str, Any],
+              timeout: Optional[float] = None) -> Tuple[bytes, str, float]:
+        """GET through the cache.
+
+        Returns (body, status, version) where status is 'hit', 'stale',
+        'revalidated' or 'miss' and version changes whenever the body does,
+        so callers can memoize work derived from it.
+
+        Raises:
+            requests.RequestException: On network errors or non-2xx responses
+        """
+        key = self.key(url, params)
+        entry = self.load(key)
+        now = time.time()
+        if entry is not None and entry['expires_at'] > now:
+            return entry['body'], 'hit', entry['version']
+        if (entry is not None and entry['expires_at'] + self.max_stale > now
+                and not entry.get('must_revalidate')):
+            self._revalidate_in_background(session, url, params, timeout, key, entry)
+            return entry['body'], 'stale', entry['version']
+        return self._request(session, url, params, timeout, key, entry)
+
+    def _revalidate_in_background(self, session: requests.Session, url: str, params: Dict[str, Any],
+                                  timeout: Optional[float], key: str, entry: Dict[str, Any]):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def revalidate():
+            try:
+                self._request(session, url, params, timeout, key, entry)
+            except requests.RequestException:
+                # Keep serving the stale entry until it ages past max_stale
+                pass
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
+    def _request(self, session: requests.Session, url: str, params: Dict[str, Any],
+                 timeout: Optional[float], key: str,
+                 entry: Optional[Dict[str, Any]]) -> Tuple[bytes, str, float]:
+        now = time.time()
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            expires_at = self.freshness(response.headers)
+            entry = dict(entry, expires_at=expires_at if expires_at is not None else now)
+            self.store(key, entry)
+            return entry['body'], 'revalidated', entry['version']
+
+        response.raise_for_status()
+        expires_at = self.freshness(response.headers)
+        if expires_at is not None:
+            cache_control = response.headers.get('Cache-Control', '').lower()
+            entry = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'expires_at': expires_at,
+                # no-cache / must-revalidate forbid serving the entry stale
+                'must_revalidate': bool(_MUST_REVALIDATE.search(cache_control)),
+                'version': now,
+                'body': response.content,
+            }
+            self.store(key, entry)
+        return response.content, 'miss', now
@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+from config.settings import settings
+from agent.metrics import RunMetrics, NULL_METRICS
+from agent.budget import Deadline, NO_DEADLINE
+from agent.units import MPS_TO_MPH
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# One insights request: {'model', 'system', 'prompt', 'temperature',
+# 'max_tokens', 'timeout', 'weather'}; 'weather' is the observation the
+# prompt was rendered from, for backends that work from data directly.
+Completion = Dict[str, Any]
+
+
+class ModelBackend(ABC):
+    """Generates insights for prompts, a batch at a time.
+
+    complete_batch returns one entry per request: the generated text or the
+    exception that request failed with. Failures of individual requests do
+    not stop the batch. reserve is time kept free for later stages when
+    sizing request timeouts. Callers send at most batch_size requests per
+    call (0: no limit) so they can stop between batches when the run budget
+    runs short.
+    """
+
+    name = 'base'
+    batch_size = 1
+
+    @abstractmethod
+    def complete_batch(self, requests: List[Completion], metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE,
+                       reserve: float = 0.0) -> List[Union[str, Exception]]:
+        """Generate text for requests; one entry per request, the text or its error."""
+
+    def complete(self, request: Completion, metrics: RunMetrics = NULL_METRICS,
+                 deadline: Deadline = NO_DEADLINE, reserve: float = 0.0) -> str:
+        """Generate text for one request, raising its error if it failed."""
+        result = self.complete_batch([request], metrics, deadline, reserve)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class OpenAIBackend(ModelBackend):
+    """Chat completions through the OpenAI SDK.
+
+    The chat API takes one conversation per call, so a batch is sent as
+    concurrent requests over the client's pooled connections, at most
+    concurrency at a time.
+    """
+
+    name = 'openai'
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None,
+                 concurrency: int = 4, model: Optional[str] = None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.model = model
+        self.batch_size = concurrency
+        self._client = None
+
+    @property
+    def client(self) -> 'OpenAI':
+        """OpenAI client, created on first use.
+
+        The SDK is imported here too: it is the largest import in the
+        package, and fetch/email-only runs never load it.
+        """
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._client
+
+    def _complete(self, client: 'OpenAI', request: Completion, metrics: RunMetrics,
+                  deadline: Deadline, reserve: float) -> Union[str, Exception]:
+        try:
+            with metrics.span('llm'):
+                response = client.chat.completions.create(
+                    model=self.model or request['model'],
+                    messages=[
+                        {"role": "system", "content": request['system']},
+                        {"role": "user", "content": request['prompt']}
+                    ],
+                    temperature=request['temperature'],
+                    max_tokens=request['max_tokens'],
+                    timeout=deadline.timeout(request['timeout'], reserve)
+                )
+            return response.choices[0].message.content
+        except Exception as e:
+            return e
+
+    def complete_batch(self, requests: List[Completion], metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE,
+                       reserve: float = 0.0) -> List[Union[str, Exception]]:
+        if deadline.expired:
+            raise TimeoutError("Run budget exhausted before insights")
+        # Retries would each get a full timeout, so a bounded run makes one attempt
+        client = self.client if deadline.budget is None else self.client.with_options(max_retries=0)
+        if len(requests) == 1:
+            return [self._complete(client, requests[0], metrics, deadline, reserve)]
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(requests))) as pool:
+            return list(pool.map(lambda r: self._complete(client, r, metrics, deadline, reserve), requests))
+
+
+class LocalBackend(OpenAIBackend):
+    """A local OpenAI-compatible server (vLLM, llama.cpp server, Ollama, LM Studio).
+
+    Same wire protocol as OpenAIBackend, pointed at local_llm_base_url.
+    Servers with continuous batching merge the concurrent requests of a
+    batch on the GPU, so concurrency can usually be set well above what a
+    hosted API tolerates. local_llm_model, when set, replaces every
+    request's model name, since local servers rarely serve the hosted ones.
+    """
+
+    name = 'local'
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None,
+                 concurrency: int = 16, model: Optional[str] = None):
+        # The SDK insists on a key; local servers generally ignore it
+        super().__init__(api_key or 'local', base_url, concurrency, model)
+
+
+class TemplateBackend(ModelBackend):
+    """Offline rule-based insights built from the observation itself; no model, no network.
+
+    Covers what the prompt asks for (a summary, what to wear and notable
+    conditions) in a few fixed English sentences, so it ignores the
+    prompt's wording, tenant language and sampling settings. Useful as a
+    free fallback for bulk sends and for slim deployments without the
+    OpenAI SDK.
+    """
+
+    name = 'template'
+    batch_size = 0
+
+    def insights(self, weather: Dict[str, Any]) -> str:
+        unit = weather.get('temp_unit', '°C')
+        feels_like = weather['feels_like']
+        wind = weather['wind_speed']
+        if unit == '°F':
+            feels_like = (feels_like - 32) * 5 / 9
+            wind = wind / MPS_TO_MPH
+        description = str(weather['description'])
+        lines = [
+            f"{description.capitalize()} in {weather['city']}, {weather['temperature']}{unit} "
+            f"(feels like {weather['feels_like']}{unit})."
+        ]
+        if feels_like < 0:
+            lines.append("Bundle up: a heavy coat, hat and gloves are in order.")
+        elif feels_like < 10:
+            lines.append("Wear a warm jacket.")
+        elif feels_like < 18:
+            lines.append("A light jacket or sweater should be enough.")
+        elif feels_like < 26:
+            lines.append("Light clothing will be comfortable.")
+        else:
+            lines.append("Dress light, stay hydrated and avoid the midday sun.")
+        lowered = description.lower()
+        if any(word in lowered for word in ('rain', 'drizzle', 'shower', 'thunder')):
+            lines.append("Take an umbrella and allow extra time for travel.")
+        if 'snow' in lowered or 'sleet' in lowered:
+            lines.append("Expect slippery roads and pavements.")
+        if 'fog' in lowered or 'mist' in lowered:
+            lines.append("Visibility may be poor; drive carefully.")
+        if wind >= 10:
+            lines.append("Strong winds: secure loose items outdoors.")
+        if weather.get('humidity', 0) >= 85 and feels_like >= 20:
+            lines.append("High humidity will make it feel muggy.")
+        return ' '.join(lines)
+
+    def complete_batch(self, requests: List[Completion], metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE,
+                       reserve: float = 0.0) -> List[Union[str, Exception]]:
+        results: List[Union[str, Exception]] = []
+        with metrics.span('llm_template'):
+            for request in requests:
+                try:
+                    results.append(self.insights(request['weather']))
+                except (KeyError, TypeError, ValueError) as e:
+                    results.append(ValueError(f"Template insights need a weather observation: {str(e)}"))
+        return results
+
+
+def get_model_backend(name: Optional[str] = None) -> ModelBackend:
+    """Build the configured model backend (openai, local or template).
+
+    Raises:
+        ValueError: If the backend is unknown or its settings are missing
+    """
+    name = name or settings.llm_backend
+    if name == 'openai':
+        if not settings.openai_api_key:
+            raise ValueError("The openai model backend requires OPENAI_API_KEY")
+        return OpenAIBackend(settings.openai_api_key, settings.openai_base_url, settings.llm_concurrency)
+    if name == 'local':
+        if not settings.local_llm_base_url:
+            raise ValueError("The local model backend requires LOCAL_LLM_BASE_URL")
+        return LocalBackend(settings.local_llm_base_url, settings.local_llm_api_key,
+                            settings.local_llm_concurrency, settings.local_llm_model)
+    if name == 'template':
+        return TemplateBackend()
+    raise ValueError(f"Unknown model backend '{name}' (expected openai, local or template)")
@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class RunMetrics:
+    """Collects per-stage timing spans for one weather run.
+
+    Spans with the same name accumulate, so a digest run reports the total
+    and worst-case time spent fetching across all cities.
+    """
+
+    def __init__(self):
+        # stage -> [count, total seconds, max seconds]; constant size per stage
+        self.stats: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage: str) -> Iterator[None]:
+        """Time the enclosed block under the given stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float, count: int = 1, max_seconds: Optional[float] = None):
+        with self._lock:
+            stats = self.stats.get(stage)
+            if stats is None:
+                stats = self.stats[stage] = [0, 0.0, 0.0]
+            stats[0] += count
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds if max_seconds is None else max_seconds)
+
+    def merge(self, summary: Dict[str, Dict[str, Any]], rename: Optional[Dict[str, str]] = None):
+        """Fold another run's summary() into this one (e.g. from a shard)."""
+        rename = rename or {}
+        for stage, stats in summary.items():
+            self.record(rename.get(stage, stage), stats['total_ms'] / 1000,
+                        count=stats['count'], max_seconds=stats['max_ms'] / 1000)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Structured per-stage totals suitable for the run result dict."""
+        with self._lock:
+            return {
+                stage: {
+                    'count': count,
+                    'total_ms': round(total * 1000, 3),
+                    'max_ms': round(longest * 1000, 3),
+                }
+                for stage, (count, total, longest) in self.stats.items()
+            }
+
+    def to_prometheus(self, prefix: str = 'weather_agent') -> str:
+        """Render the run as Prometheus/OpenMetrics text exposition."""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_duration_seconds Total time spent in each stage of the last run.",
+            f"# TYPE {prefix}_stage_duration_seconds gauge",
+        ]
+        for stage, stats in summary.items():
+            lines.append(f'{prefix}_stage_duration_seconds{{stage="{stage}"}} {stats["total_ms"] / 1000:.6f}')
+        lines += [
+            f"# HELP {prefix}_stage_calls Number of spans recorded for each stage of the last run.",
+            f"# TYPE {prefix}_stage_calls gauge",
+        ]
+        for stage, stats in summary.items():
+            lines.append(f'{prefix}_stage_calls{{stage="{stage}"}} {stats["count"]}')
+        lines.append("# EOF")
+        return '\n'.join(lines) + '\n'
+
+    def to_cloud_logging(self, message: str = "Weather run metrics", **fields) -> str:
+        """Render the run as a Cloud Logging structured JSON log line."""
+        return json.dumps({
+            'severity': 'INFO',
+            'message': message,
+            'stages': self.summary(),
+            **fields,
+        })
+
+
+class _NullMetrics(RunMetrics):
+    """Metrics sink used when a caller does not collect timings."""
+
+    def record(self, stage: str, seconds: float, count: int = 1, max_seconds: Optional[float] = None):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+def export_metrics(metrics: RunMetrics, fmt: str, textfile: Optional[str] = None, **fields) -> Optional[str]:
+    """Export run metrics in the configured format.
+
+    'json' prints a Cloud Logging line to stdout, 'prometheus' writes the text
+    exposition to textfile (or stdout when unset). Returns the rendered text.
+    """
+    if fmt == 'json':
+        rendered = metrics.to_cloud_logging(**fields)
+    elif fmt == 'prometheus':
+        rendered = metrics.to_prometheus()
+        if textfile:
+            # Atomic replace so a textfile collector never reads a partial file
+            tmp_path = f"{textfile}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(rendered)
+            os.replace(tmp_path, textfile)
+            return rendered
+    else:
+        return None
+    print(rendered, flush=True)
+    return rendered
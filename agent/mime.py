@@ -0,0 +1,57 @@
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import compat32
+from typing import Dict, Tuple
+
+# SMTP wants CRLF line endings; smtplib sends bytes as given
+SMTP_COMPAT32 = compat32.clone(linesep='\r\n')
+
+
+def build_message(message: Dict[str, str], sender: str) -> MIMEMultipart:
+    """Build a plain-text + HTML email from rendered parts ({'to', 'subject', 'text', 'html'})."""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    if message.get('to'):
+        msg['To'] = message['to']
+    msg['Subject'] = message['subject']
+    msg.attach(MIMEText(message['text'], 'plain'))
+    msg.attach(MIMEText(message['html'], 'html'))
+    return msg
+
+
+def to_header(recipient: str) -> bytes:
+    """Encoded To header line for a recipient.
+
+    Raises:
+        ValueError: If the recipient contains line breaks (header injection)
+    """
+    if '\r' in recipient or '\n' in recipient:
+        raise ValueError(f"Invalid recipient {recipient!r}")
+    try:
+        value = recipient.encode('ascii')
+    except UnicodeEncodeError:
+        value = Header(recipient, 'utf-8').encode().encode('ascii')
+    return b'To: ' + value + b'\r\n'
+
+
+class SharedMessageEncoder:
+    """Serializes rendered messages to SMTP-ready bytes, encoding each distinct report once.
+
+    Everything but the To header is identical for recipients of the same
+    report, so the headers and body are built and serialized once and each
+    recipient's bytes are their To header followed by the shared bytes.
+    Keep one encoder per batch; it holds every distinct report.
+    """
+
+    def __init__(self, sender: str):
+        self.sender = sender
+        self._shared: Dict[Tuple[str, str, str], bytes] = {}
+
+    def encode(self, message: Dict[str, str]) -> bytes:
+        key = (message['subject'], message['text'], message['html'])
+        shared = self._shared.get(key)
+        if shared is None:
+            msg = build_message({'subject': key[0], 'text': key[1], 'html': key[2]}, self.sender)
+            shared = self._shared[key] = msg.as_bytes(policy=SMTP_COMPAT32)
+        return to_header(message['to']) + shared
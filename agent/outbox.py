@@ -0,0 +1,243 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from agent.metrics import RunMetrics, NULL_METRICS
+from agent.budget import Deadline, NO_DEADLINE
+
+# (recipient, serialized message) pairs in; one error (or None on success) per message out
+DeliverBatch = Callable[[List[Tuple[str, str]], RunMetrics, Deadline], List[Optional[Exception]]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',
+    claimed_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """Failures that will not succeed on retry: SMTP 5xx replies and HTTP 4xx (bar 408/429)."""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        status = response.status_code
+        return 400 <= status < 500 and status not in (408, 429)
+    code = getattr(error, 'smtp_code', None)
+    if code is None:
+        # SMTPRecipientsRefused carries per-recipient codes
+        codes = [c for c, _ in getattr(error, 'recipients', {}).values()]
+        code = min(codes) if codes else None
+    return code is not None and 500 <= code < 600
+
+
+class Outbox:
+    """Durable sqlite queue of serialized outgoing messages.
+
+    Messages stay queued until delivered, so a failed or interrupted send is
+    retried by a later drain instead of being lost. Claimed batches carry a
+    lease; rows claimed by a process that died are picked up again once the
+    lease runs out.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+
+    def enqueue(self, recipient: str, message: str) -> int:
+        """Persist a message for delivery and return its id."""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO outbox (recipient, message, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                (recipient, message, now, now)
+            )
+        return cursor.lastrowid
+
+    def enqueue_many(self, items: List[Tuple[str, str]]):
+        """Persist several (recipient, message) pairs in one transaction."""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                self._db.executemany(
+                    "INSERT INTO outbox (recipient, message, enqueued_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                    [(recipient, message, now, now) for recipient, message in items]
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+
+    def claim(self, limit: int) -> List[Tuple[int, str, str, float, int]]:
+        """Lease up to limit due messages as (id, recipient, message, enqueued_at, attempts)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                rows = self._db.execute(
+                    "SELECT id, recipient, message, enqueued_at, attempts FROM outbox "
+                    "WHERE (status = 'pending' AND next_attempt_at <= ?) "
+                    "OR (status = 'sending' AND claimed_at <= ?) "
+                    "ORDER BY id LIMIT ?",
+                    (now, now - self.lease_seconds, limit)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                    [(now, row[0]) for row in rows]
+                )
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return rows
+
+    def mark_sent(self, ids: List[int]):
+        with self._lock:
+            self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids])
+
+    def mark_failed(self, message_id: int, error: str, retry_at: Optional[float]):
+        """Release a message for another attempt at retry_at, or dead-letter it if None."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt_at = ?, "
+                "claimed_at = NULL, last_error = ? WHERE id = ?",
+                ('pending' if retry_at is not None else 'dead', retry_at or 0, error, message_id)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, dead letters and age of the oldest undelivered message."""
+        with self._lock:
+            depth, dead, oldest = self._db.execute(
+                "SELECT SUM(status != 'dead'), SUM(status = 'dead'), "
+                "MIN(CASE WHEN status != 'dead' THEN enqueued_at END) FROM outbox"
+            ).fetchone()
+        return {
+            'depth': depth or 0,
+            'dead': dead or 0,
+            'oldest_age_seconds': round(time.time() - oldest, 3) if oldest else 0.0,
+        }
+
+
+class OutboxSender:
+    """Drains an Outbox in batches, one delivery session per batch.
+
+    Failed messages are retried with exponential backoff up to max_attempts;
+    permanent failures are dead-lettered at once. Can drain inline (e.g. at
+    the end of a function invocation) or from a background thread.
+    """
+
+    def __init__(self, outbox: Outbox, deliver_batch: DeliverBatch, batch_size: int = 50,
+                 max_attempts: int = 5, retry_seconds: float = 30.0):
+        self.outbox = outbox
+        self.deliver_batch = deliver_batch
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.logger = logging.getLogger(__name__)
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drain_lock = threading.Lock()
+
+    def drain(self, metrics: RunMetrics = NULL_METRICS,
+              deadline: Deadline = NO_DEADLINE) -> Dict[str, Any]:
+        """Deliver due messages until the queue is empty or the deadline expires.
+
+        Returns counts of sent, retried and dead-lettered messages plus the
+        queue stats afterwards. Per-message enqueue-to-delivery latency is
+        recorded as 'outbox_latency'.
+        """
+        sent = retried = dead = 0
+        with self._drain_lock:
+            while not deadline.expired:
+                batch = self.outbox.claim(self.batch_size)
+                if not batch:
+                    break
+                items = [(recipient, message) for _, recipient, message, _, _ in batch]
+                batch_failed = False
+                try:
+                    errors = self.deliver_batch(items, metrics, deadline)
+                except Exception as e:
+                    # Connection or login failure: the whole batch is retried
+                    errors = [e] * len(batch)
+                    batch_failed = True
+
+                now = time.time()
+                delivered = []
+                to_retry = 0
+                for (message_id, recipient, _, enqueued_at, attempts), error in zip(batch, errors):
+                    if error is None:
+                        delivered.append(message_id)
+                        metrics.record('outbox_latency', now - enqueued_at)
+                        continue
+                    attempts += 1
+                    if is_permanent_failure(error) or attempts >= self.max_attempts:
+                        self.outbox.mark_failed(message_id, str(error), None)
+                        self.logger.error(f"Giving up on message to {recipient} after {attempts} attempts: {str(error)}")
+                        dead += 1
+                    else:
+                        retry_at = now + self.retry_seconds * 2 ** (attempts - 1)
+                        self.outbox.mark_failed(message_id, str(error), retry_at)
+                        self.logger.warning(f"Message to {recipient} failed (attempt {attempts}), will retry: {str(error)}")
+                        to_retry += 1
+                retried += to_retry
+                self.outbox.mark_sent(delivered)
+                sent += len(delivered)
+                if batch_failed or to_retry == len(batch):
+                    # Nothing got through (server down?); leave the rest for a later drain.
+                    # A batch of dead-lettered messages says nothing about the rest.
+                    break
+        return {'sent': sent, 'retried': retried, 'dead_lettered': dead, **self.outbox.stats()}
+
+    def notify(self):
+        """Wake the background thread to drain newly queued messages."""
+        self._wake.set()
+
+    @property
+    def running(self) -> bool:
+        """Whether a background thread is draining the outbox."""
+        return self._thread is not None
+
+    def start(self, interval_seconds: float = 5.0):
+        """Drain from a daemon thread every interval_seconds (or when notified)."""
+        if self._thread is not None:
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.drain()
+                except Exception as e:
+                    self.logger.error(f"Outbox drain failed: {str(e)}")
+                self._wake.wait(interval_seconds)
+                self._wake.clear()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name='outbox-sender', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop the background thread after its current batch."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,140 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+# tracemalloc state (tracing, peak) is process-wide; one profiler owns it at a time
+_memory_lock = threading.Lock()
+
+
+class RunProfiler:
+    """Opt-in cProfile and tracemalloc capture around one run.
+
+    Use as a context manager; summary() then gives the top functions by
+    cumulative time and the top allocation sites, small enough to attach to
+    a run result. With artifact_dir set, the full pstats dump (.prof) and a
+    text report are written there too.
+
+    cProfile only sees the thread that runs the block, so work done on
+    fetch or delivery pools shows up as time spent waiting on them;
+    tracemalloc covers every thread. Only one profiler can be active per
+    process, so a run that starts while another is profiled skips CPU
+    profiling, and memory capture as well; its summary then has no memory
+    figures rather than ones mixed up with the other run's.
+    """
+
+    def __init__(self, top: int = 20, artifact_dir: Optional[str] = None, label: str = 'run'):
+        self.top = top
+        self.artifact_dir = artifact_dir
+        self.label = label
+        self.logger = logging.getLogger(__name__)
+        self._profile: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak = 0
+        self._started_tracing = False
+        self._owns_memory = False
+        self._started_at = 0.0
+
+    def __enter__(self) -> 'RunProfiler':
+        self._started_at = time.time()
+        self._owns_memory = _memory_lock.acquire(blocking=False)
+        if self._owns_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        else:
+            self.logger.warning("Memory profiling skipped: another profiled run is active")
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            self._profile = profile
+        except ValueError as e:
+            self.logger.warning(f"CPU profiling skipped: {str(e)}")
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile is not None:
+            self._profile.disable()
+        if not self._owns_memory:
+            return False
+        try:
+            if tracemalloc.is_tracing():
+                self._snapshot = tracemalloc.take_snapshot()
+                self._peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+        finally:
+            self._owns_memory = False
+            _memory_lock.release()
+        return False
+
+    def cpu_top(self) -> List[Dict[str, Any]]:
+        """Top functions by cumulative time."""
+        if self._profile is None:
+            return []
+        stats = pstats.Stats(self._profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.top]
+        return [
+            {
+                'function': f"{os.path.basename(filename)}:{line}({name})",
+                'calls': calls,
+                'own_ms': round(own * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in rows
+        ]
+
+    def memory_top(self) -> List[Dict[str, Any]]:
+        """Top allocation sites still live at the end of the run."""
+        if self._snapshot is None:
+            return []
+        snapshot = self._snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+        ))
+        return [
+            {'location': str(stat.traceback), 'size_kb': round(stat.size / 1024, 1), 'count': stat.count}
+            for stat in snapshot.statistics('lineno')[:self.top]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """CPU and memory summaries, plus artifact paths if written."""
+        summary = {
+            'cpu': self.cpu_top(),
+            'memory': (
+                {'peak_kb': round(self._peak / 1024, 1), 'top': self.memory_top()}
+                if self._snapshot is not None else {}
+            ),
+        }
+        if self.artifact_dir:
+            try:
+                summary['artifacts'] = self.write_artifacts(summary)
+            except OSError as e:
+                self.logger.warning(f"Failed to write profiling artifacts: {str(e)}")
+        return summary
+
+    def write_artifacts(self, summary: Dict[str, Any]) -> List[str]:
+        """Write the pstats dump and a text report; returns their paths."""
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S', time.gmtime(self._started_at))
+        base = os.path.join(self.artifact_dir, f"{self.label}-{stamp}-{os.getpid()}")
+        paths = []
+        report = io.StringIO()
+        if self._profile is not None:
+            self._profile.dump_stats(f"{base}.prof")
+            paths.append(f"{base}.prof")
+            pstats.Stats(self._profile, stream=report).sort_stats('cumulative').print_stats(self.top)
+        if summary['memory']:
+            report.write(f"\nPeak traced memory: {summary['memory']['peak_kb']} KiB\n")
+        for row in summary['memory'].get('top', []):
+            report.write(f"{row['size_kb']:>10} KiB  {row['count']:>7}  {row['location']}\n")
+        with open(f"{base}.txt", 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+        paths.append(f"{base}.txt")
+        return paths
@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Optional
+
+from agent.templates import template_engine
+
+
+class CityReport:
+    """One city's report for a run: the observation, its insights and every rendering of it.
+
+    The template context (derived fields such as the title-cased
+    description and unit labels) is built once and shared by the email
+    parts, the insights prompt and the CLI and JSON serializers; each is
+    rendered on first use and cached. Setting insights invalidates only the
+    rendered email parts. insights_error says why a report has no insights;
+    it is reported to API callers and never rendered into emails.
+    """
+
+    __slots__ = ('weather', '_insights', 'insights_error', '_context', '_parts', '_prompt')
+
+    def __init__(self, weather: Dict[str, Any], insights: Optional[str] = None,
+                 insights_error: Optional[str] = None):
+        self.weather = weather
+        self._insights = insights
+        self.insights_error = insights_error
+        self._context: Optional[Dict[str, Any]] = None
+        self._parts: Optional[Dict[str, str]] = None
+        self._prompt: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return 'error' not in self.weather
+
+    @property
+    def insights(self) -> Optional[str]:
+        return self._insights
+
+    @insights.setter
+    def insights(self, value: Optional[str]):
+        self._insights = value
+        self._parts = None
+
+    @property
+    def context(self) -> Dict[str, Any]:
+        if self._context is None:
+            self._context = template_engine.build_context(self.weather)
+        return self._context
+
+    @property
+    def prompt(self) -> str:
+        """The insights prompt for this observation."""
+        if self._prompt is None:
+            self._prompt = template_engine.render_prompt(self.context)
+        return self._prompt
+
+    @property
+    def parts(self) -> Dict[str, str]:
+        """Email subject, plain-text and HTML bodies, with insights embedded."""
+        if self._parts is None:
+            self._parts = template_engine.render_context(self.context, self._insights)
+        return self._parts
+
+    def message(self, recipient: str) -> Dict[str, str]:
+        """The rendered message for a recipient, ready for a delivery backend."""
+        return {'to': recipient, **self.parts}
+
+    def summary_lines(self, insights_preview: int = 100) -> List[str]:
+        """Short human-readable lines for the CLI."""
+        c = self.context
+        if not self.ok:
+            return [f"❌ {c['city']}: {c['error']}"]
+        lines = [
+            f"📍 Location: {c['city']}, {c['country']}",
+            f"🌡️ Temperature: {c['temperature']}{c['temp_unit']} (feels like {c['feels_like']}{c['temp_unit']})",
+            f"☁️ Conditions: {c['description']}",
+            f"💧 Humidity: {c['humidity']}%",
+            f"🌬️ Wind: {c['wind_speed']} {c['wind_unit']}",
+        ]
+        if self._insights:
+            lines.append(f"🤖 AI Insights: {self._insights[:insights_preview]}...")
+        return lines
+
+    def to_dict(self, bodies: bool = False) -> Dict[str, Any]:
+        """JSON-ready form for HTTP responses; bodies adds the rendered email parts."""
+        data = {'weather': self.weather, 'insights': self._insights}
+        if self.insights_error is not None:
+            data['insights_error'] = self.insights_error
+        if bodies:
+            data.update(self.parts)
+        return data
@@ -0,0 +1,91 @@
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+class CityScheduler:
+    """Priority-queue scheduler that runs a check per city at its own interval.
+
+    Each run is rescheduled at interval +/- a random jitter so cities added
+    together drift apart instead of hitting upstream APIs in lockstep. First
+    runs are spread across the jitter window for the same reason. A city whose
+    previous check is still running is not started again until it finishes.
+    """
+
+    def __init__(self, check: Callable[[str], object], jitter_seconds: float = 30.0,
+                 max_workers: int = 4, rng: Optional[random.Random] = None):
+        self.check = check
+        self.jitter_seconds = jitter_seconds
+        self.max_workers = max_workers
+        self.rng = rng or random.Random()
+        self.logger = logging.getLogger(__name__)
+        self._queue: List[Tuple[float, int, str]] = []
+        self._intervals: Dict[str, float] = {}
+        self._running: Set[str] = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def add(self, location: str, interval: float, delay: Optional[float] = None):
+        """Schedule a location every interval seconds, first after delay (default: random within jitter)."""
+        if delay is None:
+            delay = self.rng.uniform(0, self.jitter_seconds)
+        with self._lock:
+            self._intervals[location] = interval
+            self._push(time.monotonic() + delay, location)
+
+    def _push(self, due: float, location: str):
+        self._seq += 1
+        heapq.heappush(self._queue, (due, self._seq, location))
+
+    def _next_due(self, location: str, due: float) -> float:
+        jitter = self.rng.uniform(-self.jitter_seconds, self.jitter_seconds)
+        # Never schedule in the past, even with negative jitter
+        return max(due + self._intervals[location] + jitter, time.monotonic())
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """Remove and return locations due at now, rescheduling each."""
+        now = time.monotonic() if now is None else now
+        due_locations = []
+        with self._lock:
+            while self._queue and self._queue[0][0] <= now:
+                due, _, location = heapq.heappop(self._queue)
+                self._push(self._next_due(location, due), location)
+                if location in self._running:
+                    self.logger.warning(f"Skipping {location}: previous check still running")
+                    continue
+                due_locations.append(location)
+        return due_locations
+
+    def seconds_until_next(self) -> Optional[float]:
+        with self._lock:
+            if not self._queue:
+                return None
+            return max(self._queue[0][0] - time.monotonic(), 0.0)
+
+    def _run_check(self, location: str):
+        try:
+            self.check(location)
+        except Exception as e:
+            self.logger.error(f"Scheduled check for {location} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.discard(location)
+
+    def run_forever(self):
+        """Dispatch due checks to a worker pool until stop() is called."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while not self._stop.is_set():
+                for location in self.pop_due():
+                    with self._lock:
+                        self._running.add(location)
+                    pool.submit(self._run_check, location)
+                wait = self.seconds_until_next()
+                self._stop.wait(1.0 if wait is None else wait)
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,138 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List
+
+from flask import Flask, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+from agent.budget import Deadline
+from agent.coalesce import SingleFlight, StaleWhileRevalidate
+from agent.core import WeatherMonitorAgent
+from agent.report import CityReport
+from config.settings import settings
+
+
+class ReportService:
+    """Read-only weather reports for the HTTP API; never sends email.
+
+    Work runs on a bounded thread pool so a burst of requests cannot open
+    unbounded upstream connections. Concurrent requests for the same
+    location share one fetch (and one LLM call for insights), and good
+    results are reused for weather_ttl / insights_ttl seconds. After that
+    they are still served for up to max_stale seconds while a background
+    refresh runs, so only a cold or long-idle location makes a caller wait.
+    """
+
+    def __init__(self, agent: WeatherMonitorAgent, workers: int = 8, timeout: float = 20.0,
+                 weather_ttl: float = 60.0, insights_ttl: float = 900.0, max_stale: float = 0.0):
+        self.agent = agent
+        self.timeout = timeout
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='serve')
+        self._weather = StaleWhileRevalidate(weather_ttl, max_stale, keep=lambda r: r.ok)
+        # Reports whose insights failed or were skipped are not reused
+        self._insights = StaleWhileRevalidate(insights_ttl, max_stale,
+                                              keep=lambda r: r.ok and r.insights is not None)
+        # Coalesces concurrent cache misses only; results live in the caches above
+        self._inflight = SingleFlight(0.0)
+
+    def weather(self, location: str) -> CityReport:
+        """Report without insights for a location ("City" or "City,CC")."""
+        return self._cached(self._weather, 'weather', location, self._fetch)
+
+    def insights(self, location: str) -> CityReport:
+        """Report with insights for a location."""
+        return self._cached(self._insights, 'insights', location, self._generate)
+
+    def _cached(self, cache: StaleWhileRevalidate, kind: str, location: str,
+                compute: Callable[[str], CityReport]) -> CityReport:
+        key = location.strip().lower()
+        report, _ = cache.get(key, lambda: compute(location))
+        if report is not None:
+            return report
+        report = self._inflight.do((kind, key), lambda: compute(location))[0]
+        cache.put(key, report)
+        return report
+
+    def _fetch(self, location: str) -> CityReport:
+        deadline = Deadline(self.timeout)
+        return CityReport(self.agent.weather_tools.get_current_weather(location, deadline=deadline))
+
+    def _generate(self, location: str) -> CityReport:
+        deadline = Deadline(self.timeout)
+        observed = self.weather(location)
+        if not observed.ok:
+            return observed
+        # A new report so the cached weather-only one is not mutated
+        report = CityReport(observed.weather)
+        report.insights, report.insights_error = self.agent.insights_for(
+            report.weather, deadline=deadline, prompt=report.prompt
+        )
+        return report
+
+    def run(self, fn, *args):
+        """Run fn on the pool, waiting at most the request timeout.
+
+        Raises:
+            TimeoutError: If the result is not ready in time
+        """
+        try:
+            return self.pool.submit(fn, *args).result(self.timeout)
+        except FutureTimeout:
+            raise TimeoutError("Request took longer than the serve timeout")
+
+    def reports(self, locations: List[str]) -> Dict[str, CityReport]:
+        """Reports with insights keyed by location, computed concurrently."""
+        futures = {loc: self.pool.submit(self.insights, loc) for loc in dict.fromkeys(locations)}
+        try:
+            return {loc: f.result(self.timeout) for loc, f in futures.items()}
+        except FutureTimeout:
+            raise TimeoutError("Request took longer than the serve timeout")
+
+
+def create_app(service: ReportService) -> Flask:
+    """Flask app exposing GET /weather, /insights and /report.
+
+    /weather and /insights take ?city=City,CC (default: the configured
+    city); /report takes any number of ?city= (default: the configured
+    cities) and includes the rendered email bodies.
+    """
+    app = Flask(__name__)
+    logger = logging.getLogger(__name__)
+
+    def respond(report: CityReport, bodies: bool = False):
+        if not report.ok:
+            return jsonify({'error': report.weather['error']}), 502
+        return jsonify(report.to_dict(bodies))
+
+    @app.errorhandler(TimeoutError)
+    def timed_out(e):
+        return jsonify({'error': str(e)}), 504
+
+    @app.errorhandler(Exception)
+    def failed(e):
+        if isinstance(e, HTTPException):
+            return e
+        logger.error(f"Request failed: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+    @app.get('/weather')
+    def weather():
+        city = request.args.get('city') or settings.city_list()[0]
+        return respond(service.run(service.weather, city))
+
+    @app.get('/insights')
+    def insights():
+        city = request.args.get('city') or settings.city_list()[0]
+        return respond(service.run(service.insights, city))
+
+    @app.get('/report')
+    def report():
+        reports = service.reports(request.args.getlist('city') or settings.city_list())
+        return jsonify({
+            'reports': {
+                location: r.to_dict(bodies=True) if r.ok else {'error': r.weather['error']}
+                for location, r in reports.items()
+            }
+        })
+
+    return app
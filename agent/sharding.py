@@ -0,0 +1,75 @@
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+
+# Per-process agent so each shard worker keeps its own connection pools
+_shard_agent = None
+
+
+def shard_of(location: str, shard_count: int) -> int:
+    """Stable shard index for a location, identical across processes and invocations."""
+    return zlib.crc32(location.strip().lower().encode('utf-8')) % shard_count
+
+
+def shard_cities(cities: List[str], shard_count: int,
+                 shard_index: Optional[int] = None) -> List[List[str]]:
+    """Partition cities into shard_count shards (or return only shard_index's shard).
+
+    Uses a stable hash so separate function invocations given the same city
+    list and shard count agree on which shard owns each city.
+    """
+    shards: List[List[str]] = [[] for _ in range(shard_count)]
+    for city in dict.fromkeys(cities):
+        shards[shard_of(city, shard_count)].append(city)
+    if shard_index is not None:
+        return [shards[shard_index]]
+    return shards
+
+
+def _run_shard(cities: List[str], recipients: List[str], stages: List[str],
+               budget_seconds: Optional[float]) -> Dict[str, Any]:
+    """Process-pool entry point: run one shard's stages with this process's agent."""
+    global _shard_agent
+    from agent.budget import Deadline
+    from agent.core import WeatherMonitorAgent
+
+    if _shard_agent is None:
+        _shard_agent = WeatherMonitorAgent()
+    return _shard_agent.run_batch(
+        cities, recipients, stages,
+        deadline=Deadline(budget_seconds),
+        allow_sharding=False,
+        export_metrics=False
+    )
+
+
+def run_shards(shards: List[List[str]], recipients: List[str], stages: List[str],
+               processes: int, budget_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Run each shard's batch in a process pool and return the per-shard results."""
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            pool.submit(_run_shard, shard, recipients, stages, budget_seconds)
+            for shard in shards if shard
+        ]
+        return [future.result() for future in futures]
+
+
+def merge_shard_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-shard batch results into one weather/insights/skipped view."""
+    merged = {
+        'weather_data': {},
+        'ai_insights': {},
+        'ai_insights_errors': {},
+        'skipped_stages': [],
+        'errors': [],
+    }
+    for result in results:
+        if 'error' in result:
+            merged['errors'].append(result['error'])
+        merged['weather_data'].update(result.get('weather_data', {}))
+        merged['ai_insights'].update(result.get('ai_insights', {}))
+        merged['ai_insights_errors'].update(result.get('ai_insights_errors', {}))
+        for stage in result.get('skipped_stages', []):
+            if stage not in merged['skipped_stages']:
+                merged['skipped_stages'].append(stage)
+    return merged
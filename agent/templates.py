@@ -0,0 +1,271 @@
+import html
+from datetime import datetime
+from string import Formatter
+from typing import Dict, Any, List, Optional, Tuple
+
+from agent.units import UNIT_SYSTEMS
+
+
+class CompiledTemplate:
+    """A template parsed once into literal and field segments for fast rendering."""
+
+    _formatter = Formatter()
+
+    def __init__(self, source: str, escape_html: bool = False):
+        self.source = source
+        self.escape_html = escape_html
+        self.segments: List[Tuple[str, Optional[str], str]] = [
+            (literal, field_name, format_spec or '')
+            for literal, field_name, format_spec, _ in self._formatter.parse(source)
+        ]
+        self.fields = tuple(name for _, name, _ in self.segments if name)
+
+    def render(self, context: Dict[str, Any]) -> str:
+        """Render the template against a context mapping."""
+        parts = []
+        for literal, field_name, format_spec in self.segments:
+            parts.append(literal)
+            if field_name is not None:
+                value = format(context[field_name], format_spec)
+                parts.append(html.escape(value) if self.escape_html else value)
+        return ''.join(parts)
+
+
+SUBJECT_TEMPLATE = "🌤️ Daily Weather Report - {city}, {country}"
+
+TEXT_BODY_TEMPLATE = """🌤️ Daily Weather Report
+📅 {timestamp}
+📍 {city}, {country}
+
+🌡️ Temperature: {temperature}{temp_unit} (feels like {feels_like}{temp_unit})
+☁️ Conditions: {description_title}
+💧 Humidity: {humidity}%
+🌬️ Wind: {wind_speed} {wind_unit}
+📊 Pressure: {pressure} hPa
+
+🌅 Sunrise: {sunrise}
+🌇 Sunset: {sunset} ({utc_offset})"""
+
+TEXT_INSIGHTS_TEMPLATE = "\n🤖 AI Insights\n{insights}"
+
+TEXT_FOOTER_TEMPLATE = """
+---
+Sent by your Weather Monitor Agent 🤖"""
+
+HTML_BODY_TEMPLATE = """<html>
+<body style="font-family: sans-serif;">
+<h2>🌤️ Daily Weather Report</h2>
+<p>📅 {timestamp}<br>📍 {city}, {country}</p>
+<ul>
+<li>🌡️ Temperature: {temperature}{temp_unit} (feels like {feels_like}{temp_unit})</li>
+<li>☁️ Conditions: {description_title}</li>
+<li>💧 Humidity: {humidity}%</li>
+<li>🌬️ Wind: {wind_speed} {wind_unit}</li>
+<li>📊 Pressure: {pressure} hPa</li>
+</ul>
+<p>🌅 Sunrise: {sunrise}<br>🌇 Sunset: {sunset} ({utc_offset})</p>"""
+
+HTML_INSIGHTS_TEMPLATE = "<h3>🤖 AI Insights</h3>\n<p style=\"white-space: pre-wrap;\">{insights}</p>"
+
+HTML_FOOTER_TEMPLATE = """<hr>
+<p>Sent by your Weather Monitor Agent 🤖</p>
+</body>
+</html>"""
+
+INSIGHTS_PROMPT_TEMPLATE = """As a weather expert, analyze this weather data and provide helpful insights:
+
+City: {city}, {country}
+Temperature: {temperature}{temp_unit} (feels like {feels_like}{temp_unit})
+Conditions: {description}
+Humidity: {humidity}%
+Wind: {wind_speed} {wind_unit}
+Pressure: {pressure} hPa
+Sunrise: {sunrise}
+Sunset: {sunset}
+
+Provide:
+1. A brief weather summary
+2. Any notable weather patterns
+3. Recommendations for the day (clothing, activities, etc.)
+4. Any weather alerts or warnings if applicable
+
+Keep it concise and friendly.
+"""
+
+ERROR_SUBJECT_TEMPLATE = "🌤️ Daily Weather Report - {city}"
+
+ERROR_TEXT_TEMPLATE = "❌ Weather Report Error\n\n{error}"
+
+ERROR_HTML_TEMPLATE = """<html>
+<body style="font-family: sans-serif;">
+<h2>❌ Weather Report Error</h2>
+<p>{error}</p>
+</body>
+</html>"""
+
+DIGEST_SUBJECT_TEMPLATE = "🌤️ Daily Weather Digest - {city_count} cities"
+
+DIGEST_TEXT_HEADER = """🌤️ Daily Weather Digest
+📅 {timestamp}
+
+City                      Temp    Feels   Humidity  Wind      Conditions
+------------------------  ------  ------  --------  --------  ----------------"""
+
+DIGEST_TEXT_ROW = "{location:<24}  {temperature:>6}  {feels_like:>6}  {humidity:>8}  {wind_speed:>8}  {description_title}"
+
+DIGEST_TEXT_ERROR_ROW = "{location:<24}  ❌ {error}"
+
+DIGEST_TEXT_INSIGHT = "\n🤖 {location}\n{insights}"
+
+DIGEST_TEXT_FOOTER = """
+---
+Sent by your Weather Monitor Agent 🤖"""
+
+DIGEST_HTML_HEADER = """<html>
+<body style="font-family: sans-serif;">
+<h2>🌤️ Daily Weather Digest</h2>
+<p>📅 {timestamp}</p>
+<table border="1" cellpadding="4" cellspacing="0">
+<tr><th>City</th><th>Temp ({temp_unit})</th><th>Feels like ({temp_unit})</th><th>Humidity (%)</th><th>Wind ({wind_unit})</th><th>Conditions</th><th>Sunrise</th><th>Sunset</th></tr>"""
+
+DIGEST_HTML_ROW = "<tr><td>{location}</td><td>{temperature}</td><td>{feels_like}</td><td>{humidity}</td><td>{wind_speed}</td><td>{description_title}</td><td>{sunrise}</td><td>{sunset}</td></tr>"
+
+DIGEST_HTML_ERROR_ROW = "<tr><td>{location}</td><td colspan=\"7\">❌ {error}</td></tr>"
+
+DIGEST_HTML_INSIGHT = "<h3>🤖 {location}</h3>\n<p style=\"white-space: pre-wrap;\">{insights}</p>"
+
+DIGEST_HTML_FOOTER = """<hr>
+<p>Sent by your Weather Monitor Agent 🤖</p>
+</body>
+</html>"""
+
+
+class TemplateEngine:
+    """Registry of compiled email templates with per-city fragment caching."""
+
+    def __init__(self):
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.register('subject', SUBJECT_TEMPLATE)
+        self.register('text', TEXT_BODY_TEMPLATE)
+        self.register('html', HTML_BODY_TEMPLATE, escape_html=True)
+        self.register('text_insights', TEXT_INSIGHTS_TEMPLATE)
+        self.register('html_insights', HTML_INSIGHTS_TEMPLATE, escape_html=True)
+        self.register('text_footer', TEXT_FOOTER_TEMPLATE)
+        self.register('html_footer', HTML_FOOTER_TEMPLATE, escape_html=True)
+        self.register('insights_prompt', INSIGHTS_PROMPT_TEMPLATE)
+        self.register('error_subject', ERROR_SUBJECT_TEMPLATE)
+        self.register('error_text', ERROR_TEXT_TEMPLATE)
+        self.register('error_html', ERROR_HTML_TEMPLATE, escape_html=True)
+        self.register('digest_subject', DIGEST_SUBJECT_TEMPLATE)
+        self.register('digest_text_header', DIGEST_TEXT_HEADER)
+        self.register('digest_text_row', DIGEST_TEXT_ROW)
+        self.register('digest_text_error_row', DIGEST_TEXT_ERROR_ROW)
+        self.register('digest_text_insight', DIGEST_TEXT_INSIGHT)
+        self.register('digest_text_footer', DIGEST_TEXT_FOOTER)
+        self.register('digest_html_header', DIGEST_HTML_HEADER, escape_html=True)
+        self.register('digest_html_row', DIGEST_HTML_ROW, escape_html=True)
+        self.register('digest_html_error_row', DIGEST_HTML_ERROR_ROW, escape_html=True)
+        self.register('digest_html_insight', DIGEST_HTML_INSIGHT, escape_html=True)
+        self.register('digest_html_footer', DIGEST_HTML_FOOTER, escape_html=True)
+
+    def register(self, name: str, source: str, escape_html: bool = False):
+        """Compile and register a template under the given name."""
+        self.templates[name] = CompiledTemplate(source, escape_html=escape_html)
+
+    def build_context(self, weather_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the template context, computing derived fields once."""
+        context = dict(weather_data)
+        context.setdefault('city', 'Unknown')
+        context.setdefault('utc_offset', 'local time')
+        for key, label in UNIT_SYSTEMS['metric'].items():
+            context.setdefault(key, label)
+        if 'description' in context:
+            context['description_title'] = str(context['description']).title()
+        return context
+
+    def render_fragment(self, weather_data: Dict[str, Any],
+                        insights: Optional[str] = None) -> Dict[str, str]:
+        """Render subject, plain-text and HTML parts for one city."""
+        return self.render_context(self.build_context(weather_data), insights)
+
+    def render_context(self, context: Dict[str, Any], insights: Optional[str] = None) -> Dict[str, str]:
+        """Render subject, plain-text and HTML parts from a built context.
+
+        Insights, when given, are embedded above the footer.
+        """
+        t = self.templates
+        if 'error' in context:
+            return {
+                'subject': t['error_subject'].render(context),
+                'text': t['error_text'].render(context),
+                'html': t['error_html'].render(context),
+            }
+        text_parts = [t['text'].render(context)]
+        html_parts = [t['html'].render(context)]
+        if insights:
+            section = {'insights': insights}
+            text_parts.append(t['text_insights'].render(section))
+            html_parts.append(t['html_insights'].render(section))
+        text_parts.append(t['text_footer'].render(context))
+        html_parts.append(t['html_footer'].render(context))
+        return {
+            'subject': t['subject'].render(context),
+            'text': '\n'.join(text_parts),
+            'html': '\n'.join(html_parts),
+        }
+
+    def render_prompt(self, context: Dict[str, Any]) -> str:
+        """Render the insights prompt from a built context."""
+        return self.templates['insights_prompt'].render(context)
+
+    def render_digest(self, rows: List[Tuple[str, Dict[str, Any]]],
+                      insights: Optional[Dict[str, str]] = None,
+                      units: str = 'metric') -> Dict[str, str]:
+        """Render one digest email with a table row per city.
+        
+        rows are (requested location, observation) pairs. Insights, when
+        given, are keyed by requested location and appended below the
+        table. Observations must already be expressed in units, which sets
+        the column labels.
+        """
+        insights = insights or {}
+        t = self.templates
+        header = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'city_count': len(rows),
+            **UNIT_SYSTEMS[units],
+        }
+        text_parts = [t['digest_text_header'].render(header)]
+        html_parts = [t['digest_html_header'].render(header)]
+        insight_contexts = []
+        
+        for location, weather_data in rows:
+            context = self.build_context(weather_data)
+            if 'error' in weather_data:
+                context['location'] = context['city']
+                text_parts.append(t['digest_text_error_row'].render(context))
+                html_parts.append(t['digest_html_error_row'].render(context))
+                continue
+            context['location'] = f"{context['city']}, {context['country']}"
+            text_parts.append(t['digest_text_row'].render(context))
+            html_parts.append(t['digest_html_row'].render(context))
+            if location in insights:
+                context['insights'] = insights[location]
+                insight_contexts.append(context)
+        
+        html_parts.append('</table>')
+        for context in insight_contexts:
+            text_parts.append(t['digest_text_insight'].render(context))
+            html_parts.append(t['digest_html_insight'].render(context))
+        text_parts.append(t['digest_text_footer'].render(header))
+        html_parts.append(t['digest_html_footer'].render(header))
+        
+        return {
+            'subject': t['digest_subject'].render(header),
+            'text': '\n'.join(text_parts),
+            'html': '\n'.join(html_parts),
+        }
+
+
+# Templates are compiled once per process and shared
+template_engine = TemplateEngine()
@@ -0,0 +1,185 @@
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from agent.units import UNIT_SYSTEMS
+
+try:
+    import yaml
+except ImportError:  # Optional: only needed for YAML registries
+    yaml = None
+
+INSIGHT_MODES = ('full', 'brief', 'off')
+
+SQLITE_QUERY = "SELECT id, cities, recipients, units, language, insight_mode, system_prompt FROM tenants"
+
+
+def _key(value: str) -> str:
+    """Normalized lookup key, so "Tokyo, JP" and "tokyo,jp" match."""
+    return ','.join(part.strip() for part in value.lower().split(','))
+
+
+class Tenant:
+    """One customer: the cities they follow, who receives the digest, and how it reads."""
+
+    __slots__ = ('tenant_id', 'cities', 'recipients', 'units', 'language', 'insight_mode', 'system_prompt')
+
+    def __init__(self, tenant_id: str, cities: List[str], recipients: List[str],
+                 units: str = 'metric', language: str = 'en', insight_mode: str = 'full',
+                 system_prompt: Optional[str] = None):
+        if not cities or not recipients:
+            raise ValueError(f"Tenant '{tenant_id}' needs at least one city and one recipient")
+        if units not in UNIT_SYSTEMS:
+            raise ValueError(f"Tenant '{tenant_id}' has unknown units '{units}'")
+        if insight_mode not in INSIGHT_MODES:
+            raise ValueError(f"Tenant '{tenant_id}' has unknown insight_mode '{insight_mode}'")
+        self.tenant_id = tenant_id
+        self.cities = list(dict.fromkeys(cities))
+        self.recipients = list(dict.fromkeys(recipients))
+        self.units = units
+        self.language = language
+        self.insight_mode = insight_mode
+        self.system_prompt = system_prompt
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Tenant':
+        """Build a tenant from a registry entry; missing optional fields take defaults."""
+        try:
+            tenant_id = str(data['id'])
+            cities, recipients = data['cities'], data['recipients']
+        except KeyError as e:
+            raise ValueError(f"Tenant entry is missing {e}") from e
+        if isinstance(cities, str):
+            cities = [c.strip() for c in cities.split(';') if c.strip()]
+        if isinstance(recipients, str):
+            recipients = [r.strip() for r in recipients.split(';') if r.strip()]
+        return cls(
+            tenant_id, cities, recipients,
+            units=data.get('units') or 'metric',
+            language=data.get('language') or 'en',
+            insight_mode=data.get('insight_mode') or 'full',
+            system_prompt=data.get('system_prompt')
+        )
+
+    def narrowed(self, cities: Optional[List[str]] = None,
+                 recipients: Optional[List[str]] = None) -> Optional['Tenant']:
+        """Copy limited to the given cities/recipients, or None if nothing is left."""
+        keep_cities = self.cities
+        if cities is not None:
+            wanted = {_key(c) for c in cities}
+            keep_cities = [c for c in self.cities if _key(c) in wanted]
+        keep_recipients = self.recipients
+        if recipients is not None:
+            wanted = {r.lower() for r in recipients}
+            keep_recipients = [r for r in self.recipients if r.lower() in wanted]
+        if not keep_cities or not keep_recipients:
+            return None
+        return Tenant(self.tenant_id, keep_cities, keep_recipients, self.units,
+                      self.language, self.insight_mode, self.system_prompt)
+
+    def insight_profile(self) -> Tuple[str, str, Optional[str], str]:
+        """Tenants with the same profile can share generated insights (which quote their units)."""
+        return self.language, self.insight_mode, self.system_prompt, self.units
+
+
+class TenantRegistry:
+    """In-memory tenant index with constant-time lookup by id, city and recipient."""
+
+    def __init__(self, tenants: Iterable[Tenant] = ()):
+        self.tenants: Dict[str, Tenant] = {}
+        self._by_city: Dict[str, List[Tenant]] = {}
+        self._by_recipient: Dict[str, List[Tenant]] = {}
+        for tenant in tenants:
+            self.add(tenant)
+
+    def __len__(self) -> int:
+        return len(self.tenants)
+
+    def add(self, tenant: Tenant):
+        if tenant.tenant_id in self.tenants:
+            raise ValueError(f"Duplicate tenant id '{tenant.tenant_id}'")
+        self.tenants[tenant.tenant_id] = tenant
+        for city in tenant.cities:
+            self._by_city.setdefault(_key(city), []).append(tenant)
+        for recipient in tenant.recipients:
+            self._by_recipient.setdefault(recipient.lower(), []).append(tenant)
+
+    def get(self, tenant_id: str) -> Optional[Tenant]:
+        return self.tenants.get(tenant_id)
+
+    def for_city(self, location: str) -> List[Tenant]:
+        """Tenants following a location ("City,CC")."""
+        return self._by_city.get(_key(location), [])
+
+    def for_recipient(self, email: str) -> List[Tenant]:
+        """Tenants that send to an email address."""
+        return self._by_recipient.get(email.lower(), [])
+
+    def select(self, tenant_ids: Optional[List[str]] = None, cities: Optional[List[str]] = None,
+               recipients: Optional[List[str]] = None) -> List[Tenant]:
+        """Tenants to run, each narrowed to the requested cities and recipients.
+
+        Candidates come from the id list if given, else from the city and
+        recipient indexes, else every tenant.
+
+        Raises:
+            ValueError: If a tenant id is unknown
+        """
+        if tenant_ids is not None:
+            unknown = [t for t in tenant_ids if t not in self.tenants]
+            if unknown:
+                raise ValueError(f"Unknown tenants: {', '.join(unknown)}")
+            candidates = [self.tenants[t] for t in dict.fromkeys(tenant_ids)]
+        elif cities is not None or recipients is not None:
+            found: Dict[str, Tenant] = {}
+            for city in cities or ():
+                found.update((t.tenant_id, t) for t in self.for_city(city))
+            for recipient in recipients or ():
+                found.update((t.tenant_id, t) for t in self.for_recipient(recipient))
+            candidates = list(found.values())
+        else:
+            candidates = list(self.tenants.values())
+
+        if cities is None and recipients is None:
+            return candidates
+        narrowed = (t.narrowed(cities, recipients) for t in candidates)
+        return [t for t in narrowed if t is not None]
+
+
+def _read_entries(path: str) -> List[Dict[str, Any]]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            connection.row_factory = sqlite3.Row
+            return [dict(row) for row in connection.execute(SQLITE_QUERY)]
+        finally:
+            connection.close()
+    with open(path, encoding='utf-8') as f:
+        if extension in ('.yaml', '.yml'):
+            if yaml is None:
+                raise ValueError("YAML tenant registries require PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    # Either a list of tenants or {"tenants": [...]}
+    return data.get('tenants', []) if isinstance(data, dict) else data
+
+
+def load_registry(path: str) -> TenantRegistry:
+    """Load a tenant registry from a JSON, YAML or sqlite file.
+
+    JSON and YAML files hold a list of tenant objects (or {"tenants": [...]})
+    with "id", "cities", "recipients" and optional "units", "language",
+    "insight_mode" and "system_prompt". sqlite files need a tenants table
+    with those columns, cities and recipients separated by semicolons.
+
+    Raises:
+        ValueError: If the file is malformed or an entry is invalid
+    """
+    try:
+        entries = _read_entries(path)
+    except (OSError, sqlite3.Error) as e:
+        raise ValueError(f"Cannot read tenant registry {path}: {str(e)}") from e
+    return TenantRegistry(Tenant.from_dict(entry) for entry in entries)
@@ -0,0 +1,33 @@
+from functools import lru_cache
+from typing import Tuple
+
+SECONDS_PER_DAY = 86400
+
+
+def format_local_hhmm(timestamp: int, utc_offset: int) -> str:
+    """Format a Unix timestamp as HH:MM in a fixed UTC offset (seconds).
+
+    OpenWeather reports each location's offset in the response's
+    ``timezone`` field, so plain arithmetic gives the location's wall-clock
+    time without depending on the server's zone or building datetimes.
+    """
+    seconds_of_day = (timestamp + utc_offset) % SECONDS_PER_DAY
+    return f"{seconds_of_day // 3600:02d}:{seconds_of_day % 3600 // 60:02d}"
+
+
+@lru_cache(maxsize=16384)
+def sun_times(sunrise: int, sunset: int, utc_offset: int) -> Tuple[str, str]:
+    """Local (sunrise, sunset) as HH:MM, computed once per location per day.
+
+    Sunrise and sunset timestamps only change daily, so repeated
+    observations for the same city hit the cache.
+    """
+    return format_local_hhmm(sunrise, utc_offset), format_local_hhmm(sunset, utc_offset)
+
+
+@lru_cache(maxsize=None)
+def format_utc_offset(utc_offset: int) -> str:
+    """Human-readable offset label such as 'UTC-07:00' (a few dozen distinct values)."""
+    sign = '+' if utc_offset >= 0 else '-'
+    minutes = abs(utc_offset) // 60
+    return f"UTC{sign}{minutes // 60:02d}:{minutes % 60:02d}"
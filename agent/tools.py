@@ -1,10 +1,19 @@
+import json
 import requests
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from config.settings import settings
+from agent.templates import template_engine
+from agent.metrics import RunMetrics, NULL_METRICS
+from agent.budget import Deadline, NO_DEADLINE
+from agent.decoding import get_weather_decoder
+from agent.http_cache import HTTPCache
+from agent.outbox import Outbox, OutboxSender
+from agent.delivery import Message, get_delivery_backend
+from agent.report import CityReport
+from agent.timefmt import sun_times, format_utc_offset
+from agent.units import convert_weather
 
 
 class WeatherTools:
@@ -14,118 +23,309 @@ class WeatherTools:
         self.weather_api_key = settings.openweather_api_key
         self.city = settings.weather_city
         self.country_code = settings.weather_country_code
+        self.session = requests.Session()
+        self.decode_weather = get_weather_decoder(settings.json_decoder)
+        self.http_cache = (
+            HTTPCache(settings.http_cache_dir, settings.http_cache_default_ttl, settings.cache_max_stale_seconds)
+            if settings.http_cache_dir else None
+        )
+        # Parsed observations keyed by request, reused while the cached body is unchanged
+        self._parsed: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self.delivery = get_delivery_backend()
+        self.outbox = Outbox(settings.outbox_path) if settings.outbox_path else None
+        self.outbox_sender = (
+            OutboxSender(self.outbox, self.deliver_queued, settings.outbox_batch_size,
+                         settings.outbox_max_attempts, settings.outbox_retry_seconds)
+            if self.outbox is not None else None
+        )
+        
+    def get_current_weather(self, location: Optional[str] = None,
+                            metrics: RunMetrics = NULL_METRICS,
+                            deadline: Deadline = NO_DEADLINE) -> Dict[str, Any]:
+        """Get current weather data for a location ("City" or "City,CC").
+        
+        Defaults to the configured city.
+        """
+        if deadline.expired:
+            return {'error': "Run budget exhausted before fetching weather data"}
         
-    def get_current_weather(self) -> Dict[str, Any]:
-        """Get current weather data for the configured city."""
         try:
-            url = f"http://api.openweathermap.org/data/2.5/weather"
+            url = f"{settings.openweather_base_url}/weather"
             params = {
-                'q': f"{self.city},{self.country_code}",
+                'q': location or f"{self.city},{self.country_code}",
                 'appid': self.weather_api_key,
                 'units': 'metric'  # Use metric units
             }
             
-            response = requests.get(url, params=params)
-            response.raise_for_status()
+            timeout = deadline.timeout(settings.http_timeout_seconds)
+            if self.http_cache is None:
+                with metrics.span('fetch'):
+                    response = self.session.get(url, params=params, timeout=timeout)
+                    response.raise_for_status()
+                with metrics.span('parse'):
+                    return self.parse_weather(self.decode_weather(response.content))
             
-            data = response.json()
+            with metrics.span('fetch'):
+                content, cache_status, version = self.http_cache.fetch(self.session, url, params, timeout)
+            metrics.record(f"http_cache_{cache_status}", 0.0)
             
-            # Extract relevant weather information
-            weather_info = {
-                'city': data['name'],
-                'country': data['sys']['country'],
-                'temperature': data['main']['temp'],
-                'feels_like': data['main']['feels_like'],
-                'humidity': data['main']['humidity'],
-                'pressure': data['main']['pressure'],
-                'description': data['weather'][0]['description'],
-                'wind_speed': data['wind']['speed'],
-                'wind_direction': data['wind'].get('deg', 'N/A'),
-                'visibility': data.get('visibility', 'N/A'),
-                'sunrise': datetime.fromtimestamp(data['sys']['sunrise']).strftime('%H:%M'),
-                'sunset': datetime.fromtimestamp(data['sys']['sunset']).strftime('%H:%M'),
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
-            return weather_info
+            # Skip decoding entirely when the body has not changed since the last parse
+            memo_key = (url, params['q'])
+            memo = self._parsed.get(memo_key)
+            if memo is not None and memo[0] == version:
+                return dict(memo[1], timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            with metrics.span('parse'):
+                weather_info = self.parse_weather(self.decode_weather(content))
+            self._parsed[memo_key] = (version, weather_info)
+            return dict(weather_info)
             
         except requests.RequestException as e:
             return {'error': f"Failed to fetch weather data: {str(e)}"}
-        except KeyError as e:
+        except (KeyError, ValueError) as e:
             return {'error': f"Unexpected weather data format: {str(e)}"}
     
+    def parse_weather(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract relevant weather information from an OpenWeather payload.
+        
+        Sunrise and sunset are given in the location's local time using the
+        payload's UTC offset, not the server's time zone.
+        """
+        utc_offset = data.get('timezone', 0)
+        sunrise, sunset = sun_times(data['sys']['sunrise'], data['sys']['sunset'], utc_offset)
+        return {
+            'city': data['name'],
+            'country': data['sys']['country'],
+            'temperature': data['main']['temp'],
+            'feels_like': data['main']['feels_like'],
+            'humidity': data['main']['humidity'],
+            'pressure': data['main']['pressure'],
+            'description': data['weather'][0]['description'],
+            'wind_speed': data['wind']['speed'],
+            'wind_direction': data['wind'].get('deg', 'N/A'),
+            'visibility': data.get('visibility', 'N/A'),
+            'sunrise': sunrise,
+            'sunset': sunset,
+            'utc_offset': format_utc_offset(utc_offset),
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def get_weather_for_cities(self, locations: List[str],
+                               metrics: RunMetrics = NULL_METRICS,
+                               deadline: Deadline = NO_DEADLINE) -> Dict[str, Dict[str, Any]]:
+        """Fetch weather for many locations in one batch.
+        
+        Duplicate locations are fetched once; requests run concurrently over
+        the shared HTTP session.
+        """
+        unique = list(dict.fromkeys(locations))
+        if not unique:
+            return {}
+        if len(unique) == 1:
+            return {unique[0]: self.get_current_weather(unique[0], metrics, deadline)}
+        workers = min(settings.fetch_concurrency, len(unique))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(lambda loc: self.get_current_weather(loc, metrics, deadline), unique)
+        return dict(zip(unique, results))
+    
     def format_weather_email(self, weather_data: Dict[str, Any]) -> str:
         """Format weather data into a readable email."""
-        if 'error' in weather_data:
-            return f"❌ Weather Report Error\n\n{weather_data['error']}"
+        return template_engine.render_fragment(weather_data)['text']
+    
+    def dispatch_batch(self, messages: List[Message],
+                       metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE,
+                       queue: bool = True) -> Tuple[bool, List[Optional[Exception]]]:
+        """Queue rendered messages in the outbox if configured, else deliver them as one batch.
         
-        subject = f"🌤️ Daily Weather Report - {weather_data['city']}, {weather_data['country']}"
+        queue=False delivers directly even with an outbox. Returns (queued,
+        errors) with one error (None on success) per message.
+        """
+        if self.outbox is None or not queue:
+            return False, self.delivery.send_batch(messages, metrics, deadline)
+        with metrics.span('outbox_enqueue'):
+            self.outbox.enqueue_many([(m['to'], json.dumps(m)) for m in messages])
+        self.outbox_sender.notify()
+        return True, [None] * len(messages)
+    
+    def flush_outbox(self, metrics: RunMetrics = NULL_METRICS,
+                     deadline: Deadline = NO_DEADLINE) -> Optional[Dict[str, Any]]:
+        """Drain queued messages now unless a background sender is running.
         
-        body = f"""
-🌤️ Daily Weather Report
-📅 {weather_data['timestamp']}
-📍 {weather_data['city']}, {weather_data['country']}
-
-🌡️ Temperature: {weather_data['temperature']}°C (feels like {weather_data['feels_like']}°C)
-☁️ Conditions: {weather_data['description'].title()}
-💧 Humidity: {weather_data['humidity']}%
-🌬️ Wind: {weather_data['wind_speed']} m/s
-📊 Pressure: {weather_data['pressure']} hPa
-
-🌅 Sunrise: {weather_data['sunrise']}
-🌇 Sunset: {weather_data['sunset']}
-
----
-Sent by your Weather Monitor Agent 🤖
+        Returns the drain stats, or None when there is no outbox or the
+        background sender will deliver them.
         """
+        if self.outbox_sender is None or self.outbox_sender.running:
+            return None
+        with metrics.span('outbox_drain'):
+            return self.outbox_sender.drain(metrics, deadline)
+    
+    def deliver_queued(self, items: List[Tuple[str, str]],
+                       metrics: RunMetrics = NULL_METRICS,
+                       deadline: Deadline = NO_DEADLINE) -> List[Optional[Exception]]:
+        """Outbox callback: deliver serialized messages with the configured backend."""
+        return self.delivery.send_batch([json.loads(message) for _, message in items], metrics, deadline)
+    
+    def send_messages(self, batch: List[Tuple[Message, str]],
+                      metrics: RunMetrics = NULL_METRICS,
+                      deadline: Deadline = NO_DEADLINE,
+                      queue: bool = True) -> Dict[str, Dict[str, Any]]:
+        """Deliver (or queue) (message, label) pairs as one batch; results keyed by recipient."""
+        return {message['to']: result
+                for (message, _), result in zip(batch, self.send_batch(batch, metrics, deadline, queue))}
+    
+    def send_batch(self, batch: List[Tuple[Message, str]],
+                   metrics: RunMetrics = NULL_METRICS,
+                   deadline: Deadline = NO_DEADLINE,
+                   queue: bool = True) -> List[Dict[str, Any]]:
+        """Deliver (or queue) (message, label) pairs as one batch; one result per pair, in order."""
+        messages = [message for message, _ in batch]
+        try:
+            queued, errors = self.dispatch_batch(messages, metrics, deadline, queue)
+        except Exception as e:
+            queued, errors = False, [e] * len(messages)
         
-        return body.strip()
+        outcome = 'queued for delivery' if queued else 'sent successfully'
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        results = []
+        for (message, label), error in zip(batch, errors):
+            if error is None:
+                results.append({
+                    'success': True,
+                    'message': f"{label} {outcome} to {message['to']}",
+                    'timestamp': timestamp
+                })
+            else:
+                results.append({
+                    'success': False,
+                    'error': f"Failed to send {label.lower()}: {str(error)}",
+                    'timestamp': timestamp
+                })
+        return results
     
-    def send_weather_email(self, weather_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Send weather report via email."""
+    def send_weather_email(self, weather_data: Dict[str, Any],
+                           metrics: RunMetrics = NULL_METRICS,
+                           deadline: Deadline = NO_DEADLINE,
+                           recipient: Optional[str] = None) -> Dict[str, Any]:
+        """Send weather report via email (to the configured recipient by default)."""
+        recipient = recipient or settings.email_recipient
+        return self.send_weather_emails(weather_data, [recipient], metrics, deadline)[recipient]
+    
+    def send_weather_emails(self, weather_data: Dict[str, Any], recipients: List[str],
+                            metrics: RunMetrics = NULL_METRICS,
+                            deadline: Deadline = NO_DEADLINE) -> Dict[str, Dict[str, Any]]:
+        """Send the same weather report to several recipients in one delivery batch."""
+        return self.send_report_emails(CityReport(weather_data), recipients, metrics, deadline)
+    
+    def send_report_emails(self, report: CityReport, recipients: List[str],
+                           metrics: RunMetrics = NULL_METRICS,
+                           deadline: Deadline = NO_DEADLINE) -> Dict[str, Dict[str, Any]]:
+        """Send a city report, insights included, to several recipients in one delivery batch."""
+        recipients = list(dict.fromkeys(recipients))
         try:
-            # Format the email
-            email_body = self.format_weather_email(weather_data)
-            
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = settings.email_sender
-            msg['To'] = settings.email_recipient
-            msg['Subject'] = f"🌤️ Daily Weather Report - {weather_data.get('city', 'Unknown')}"
-            
-            # Add body to email
-            msg.attach(MIMEText(email_body, 'plain'))
-            
-            # Create SMTP session
-            server = smtplib.SMTP(settings.smtp_server, settings.smtp_port)
-            server.starttls()
-            server.login(settings.email_sender, settings.email_password)
-            
-            # Send email
-            text = msg.as_string()
-            server.sendmail(settings.email_sender, settings.email_recipient, text)
-            server.quit()
-            
-            return {
-                'success': True,
-                'message': f"Weather email sent successfully to {settings.email_recipient}",
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
-            
+            # Subject and bodies are rendered once and shared by every recipient
+            with metrics.span('render'):
+                messages = [report.message(r) for r in recipients]
         except Exception as e:
-            return {
-                'success': False,
-                'error': f"Failed to send email: {str(e)}",
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            }
+            return {r: self._failure("Failed to send weather email", e) for r in recipients}
+        return self.send_messages([(m, "Weather email") for m in messages], metrics, deadline)
+    
+    def send_digests(self, subscriptions: Dict[str, List[str]],
+                     weather_by_location: Optional[Dict[str, Dict[str, Any]]] = None,
+                     insights: Optional[Dict[str, str]] = None,
+                     metrics: RunMetrics = NULL_METRICS,
+                     deadline: Deadline = NO_DEADLINE,
+                     units: str = 'metric') -> Dict[str, Dict[str, Any]]:
+        """Send one digest per recipient for the given recipient -> locations map.
+        
+        Weather for the union of all locations is fetched in a single batch
+        unless already provided; insights are keyed by location too. Rows are shown in units ('metric' or
+        'imperial'), converting each location once. Recipients with the same
+        locations share one rendered digest, and all digests go out as one
+        delivery batch.
+        """
+        if weather_by_location is None:
+            all_locations = [loc for locs in subscriptions.values() for loc in locs]
+            weather_by_location = self.get_weather_for_cities(all_locations, metrics, deadline)
+        return self.send_digest_groups([(subscriptions, insights, units)], weather_by_location, metrics, deadline)[0]
+    
+    def send_digest_groups(self, groups: List[Tuple[Dict[str, List[str]], Optional[Dict[str, str]], str]],
+                           weather_by_location: Dict[str, Dict[str, Any]],
+                           metrics: RunMetrics = NULL_METRICS,
+                           deadline: Deadline = NO_DEADLINE) -> List[Dict[str, Dict[str, Any]]]:
+        """Send the digests of several groups (e.g. tenants) as one delivery batch.
+        
+        Each group is (recipient -> locations, insights, units) and gets its
+        own results keyed by recipient, so a recipient in two groups receives
+        both digests. A group whose digests fail to render fails alone.
+        """
+        results: List[Optional[Dict[str, Dict[str, Any]]]] = [None] * len(groups)
+        batch: List[Tuple[Message, str]] = []
+        spans = []
+        with metrics.span('render'):
+            for i, (subscriptions, insights, units) in enumerate(groups):
+                try:
+                    messages = self._render_digests(subscriptions, weather_by_location, insights, units)
+                except Exception as e:
+                    results[i] = {r: self._failure("Failed to send weather digest", e) for r in subscriptions}
+                    continue
+                spans.append((i, len(batch), len(batch) + len(messages)))
+                batch.extend(messages)
+        
+        sent = self.send_batch(batch, metrics, deadline) if batch else []
+        for i, start, end in spans:
+            results[i] = {message['to']: result for (message, _), result in zip(batch[start:end], sent[start:end])}
+        return results
     
-    def get_weather_and_send_email(self) -> Dict[str, Any]:
-        """Main function to get weather and send email report."""
-        weather_data = self.get_current_weather()
-        email_result = self.send_weather_email(weather_data)
+    def _render_digests(self, subscriptions: Dict[str, List[str]],
+                        weather_by_location: Dict[str, Dict[str, Any]],
+                        insights: Optional[Dict[str, str]], units: str) -> List[Tuple[Message, str]]:
+        """(message, label) per recipient; recipients with the same locations share one rendering."""
+        converted: Dict[str, Dict[str, Any]] = {}
+        
+        def digest_rows(locations: Tuple[str, ...]) -> List[Tuple[str, Dict[str, Any]]]:
+            rows = []
+            for loc in locations:
+                if loc not in converted:
+                    weather = weather_by_location[loc]
+                    # Label failed fetches with the requested location
+                    converted[loc] = {'city': loc, **weather} if 'error' in weather else convert_weather(weather, units)
+                rows.append((loc, converted[loc]))
+            return rows
         
+        digests: Dict[Tuple[str, ...], Tuple[Dict[str, str], str]] = {}
+        batch = []
+        for recipient, locations in subscriptions.items():
+            key = tuple(dict.fromkeys(locations))
+            if key not in digests:
+                rendered = template_engine.render_digest(digest_rows(key), insights, units)
+                digests[key] = (rendered, f"Weather digest ({len(key)} cities)")
+            rendered, label = digests[key]
+            batch.append(({'to': recipient, **rendered}, label))
+        return batch
+    
+    def _failure(self, prefix: str, error: Exception) -> Dict[str, Any]:
         return {
+            'success': False,
+            'error': f"{prefix}: {str(error)}",
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+    
+    def get_weather_and_send_email(self, metrics: RunMetrics = NULL_METRICS,
+                                   deadline: Deadline = NO_DEADLINE) -> Dict[str, Any]:
+        """Main function to get weather and send email report.
+        
+        With an outbox and no background sender, the queued email is
+        delivered before returning.
+        """
+        weather_data = self.get_current_weather(metrics=metrics, deadline=deadline)
+        email_result = self.send_weather_email(weather_data, metrics, deadline)
+        
+        result = {
             'weather_data': weather_data,
             'email_result': email_result,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        } 
\ No newline at end of file
+        }
+        outbox = self.flush_outbox(metrics, deadline)
+        if outbox is not None:
+            result['outbox'] = outbox
+        return result 
\ No newline at end of file
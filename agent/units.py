@@ -0,0 +1,27 @@
+from typing import Any, Dict
+
+# Display labels per unit system; observations are always fetched in metric
+UNIT_SYSTEMS: Dict[str, Dict[str, str]] = {
+    'metric': {'temp_unit': '°C', 'wind_unit': 'm/s'},
+    'imperial': {'temp_unit': '°F', 'wind_unit': 'mph'},
+}
+
+MPS_TO_MPH = 2.23694
+
+
+def convert_weather(weather_data: Dict[str, Any], units: str = 'metric') -> Dict[str, Any]:
+    """Express a metric observation in the given unit system.
+
+    Metric observations are returned unchanged (templates default to metric
+    labels), so renderers can keep sharing them; other systems get a copy
+    with converted values and unit labels.
+    """
+    if units not in UNIT_SYSTEMS:
+        raise ValueError(f"Unknown units '{units}' (expected one of: {', '.join(UNIT_SYSTEMS)})")
+    if units == 'metric' or 'error' in weather_data:
+        return weather_data
+    converted = dict(weather_data, **UNIT_SYSTEMS[units])
+    converted['temperature'] = round(weather_data['temperature'] * 9 / 5 + 32, 1)
+    converted['feels_like'] = round(weather_data['feels_like'] * 9 / 5 + 32, 1)
+    converted['wind_speed'] = round(weather_data['wind_speed'] * MPS_TO_MPH, 1)
+    return converted
@@ -7,6 +7,8 @@ A daily weather monitoring agent that sends weather reports via email.
 import os
 import sys
 import logging
+import signal
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -17,10 +19,13 @@ load_dotenv()
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from agent.core import WeatherMonitorAgent
+from agent.scheduler import CityScheduler
+from agent.budget import Deadline
+from agent.report import CityReport
 from config.settings import settings
 
 
-def main():
+def main(profile=False):
     """Main function to run the weather monitor agent."""
     print("🌤️ Weather Monitor Agent Starting...")
     
@@ -29,14 +34,28 @@ def main():
         agent = WeatherMonitorAgent()
         
         # Run the daily weather check
-        result = agent.run_daily_weather_check()
+        result = agent.run_daily_weather_check(profile=profile)
+        if 'profile' in result:
+            print_profile(result['profile'])
         
         if result['success']:
             print("✅ Weather check completed successfully!")
+            if 'tenants' in result:
+                # Tenant registry: one digest per tenant recipient
+                sent = sum(len(t['email_results']) for t in result['tenants'].values())
+                print(f"🏢 Served {len(result['tenants'])} tenants: {len(result['weather_data'])} locations, {sent} emails")
+                return result
             print(f"📧 Email sent to: {settings.email_recipient}")
-            print(f"📍 Location: {result['weather_data']['city']}, {result['weather_data']['country']}")
-            print(f"🌡️ Temperature: {result['weather_data']['temperature']}°C")
-            print(f"🤖 AI Insights: {result['ai_insights'][:100]}...")
+            if isinstance(result['weather_data'], list):
+                # Digest mode: one row per city
+                for weather in result['weather_data']:
+                    if 'error' not in weather:
+                        print(f"📍 {weather['city']}, {weather['country']}: {weather['temperature']}°C")
+            else:
+                for line in CityReport(result['weather_data'], result['ai_insights']).summary_lines():
+                    print(line)
+                if result.get('ai_insights_error'):
+                    print(f"🤖 AI Insights: {result['ai_insights_error']}")
         else:
             print("❌ Weather check failed!")
             if 'error' in result:
@@ -52,6 +71,18 @@ def main():
         return {'success': False, 'error': str(e)}
 
 
+def print_profile(profile, top=10):
+    """Print the hottest functions and allocation sites of a profiled run."""
+    if profile['memory']:
+        print(f"🔬 Peak traced memory: {profile['memory']['peak_kb']} KiB")
+    for row in profile['cpu'][:top]:
+        print(f"   {row['cumulative_ms']:>10.1f} ms  {row['calls']:>6} calls  {row['function']}")
+    for row in profile['memory'].get('top', [])[:top]:
+        print(f"   {row['size_kb']:>10.1f} KiB {row['count']:>6} blocks {row['location']}")
+    for path in profile.get('artifacts', []):
+        print(f"📝 Wrote {path}")
+
+
 def test_mode():
     """Test mode - get weather without sending email."""
     print("🧪 Weather Monitor Agent - Test Mode")
@@ -62,11 +93,8 @@ def test_mode():
         
         if 'error' not in weather_data:
             print("✅ Weather data retrieved successfully!")
-            print(f"📍 Location: {weather_data['city']}, {weather_data['country']}")
-            print(f"🌡️ Temperature: {weather_data['temperature']}°C")
-            print(f"☁️ Conditions: {weather_data['description']}")
-            print(f"💧 Humidity: {weather_data['humidity']}%")
-            print(f"🌬️ Wind: {weather_data['wind_speed']} m/s")
+            for line in CityReport(weather_data).summary_lines():
+                print(line)
         else:
             print(f"❌ Failed to get weather data: {weather_data['error']}")
         
@@ -77,17 +105,108 @@ def test_mode():
         return {'error': str(e)}
 
 
+def run_worker():
+    """Worker mode - long-lived process running scheduled checks per city."""
+    print("🔁 Weather Monitor Agent - Worker Mode")
+    
+    # One agent for the whole process keeps HTTP and OpenAI connection pools warm
+    agent = WeatherMonitorAgent()
+    stages = [s.strip() for s in settings.worker_stages.split(',') if s.strip()]
+    missing = settings.missing_for('fetch', 'location', *(s for s in stages if s != 'insights'),
+                                   *(['recipient'] if 'email' in stages else []))
+    if missing:
+        print(f"❌ Missing configuration for worker stages: {', '.join(missing)}")
+        return
+    
+    def check(location):
+        result = agent.run_batch(cities=[location], stages=stages)
+        weather = result.get('weather_data', {}).get(location, {})
+        if 'error' in weather:
+            agent.logger.error(f"❌ {location}: {weather['error']}")
+        elif 'error' in result:
+            agent.logger.error(f"❌ {location}: {result['error']}")
+        else:
+            agent.logger.info(f"📍 {weather['city']}, {weather['country']}: {weather['temperature']}°C, "
+                              f"{weather['description']} ({result['metrics']['total']['total_ms']:.0f} ms)")
+    
+    scheduler = CityScheduler(
+        check,
+        jitter_seconds=settings.worker_jitter_seconds,
+        max_workers=settings.worker_concurrency
+    )
+    schedule = settings.worker_schedule()
+    for location, interval in schedule.items():
+        scheduler.add(location, interval)
+    
+    # Finish in-flight checks and exit cleanly on Ctrl+C or container shutdown
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    
+    sender = agent.weather_tools.outbox_sender
+    if sender is not None and settings.outbox_drain == 'background':
+        sender.start(settings.outbox_interval_seconds)
+    
+    print(f"📅 Scheduled {len(schedule)} locations (stages: {', '.join(stages)})")
+    scheduler.run_forever()
+    if sender is not None:
+        # Flush what the last checks queued; anything undelivered stays in the outbox
+        sender.stop()
+        stats = sender.drain(deadline=Deadline(settings.smtp_timeout_seconds * 2))
+        print(f"📤 Outbox: {stats['sent']} sent on shutdown, {stats['depth']} still queued")
+    print("👋 Worker stopped")
+
+
+def run_server():
+    """Serve mode - read-only HTTP API for weather, insights and reports (never sends email)."""
+    from werkzeug.serving import make_server
+    from agent.server import ReportService, create_app
+    
+    print("🌐 Weather Monitor Agent - Serve Mode")
+    missing = settings.missing_for('fetch')
+    if missing:
+        print(f"❌ Missing configuration: {', '.join(missing)}")
+        return
+    
+    # One agent and pool for the whole process keeps HTTP and OpenAI connections warm
+    service = ReportService(
+        WeatherMonitorAgent(),
+        workers=settings.serve_workers,
+        timeout=settings.serve_timeout_seconds,
+        weather_ttl=settings.serve_weather_ttl_seconds,
+        insights_ttl=settings.serve_insights_ttl_seconds,
+        max_stale=settings.cache_max_stale_seconds
+    )
+    server = make_server(settings.serve_host, settings.serve_port, create_app(service), threaded=True)
+    
+    # shutdown() waits for serve_forever, so it must not run on the serving thread
+    stop = lambda *_: threading.Thread(target=server.shutdown).start()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    
+    print(f"📡 Listening on http://{settings.serve_host}:{settings.serve_port} (/weather, /insights, /report)")
+    server.serve_forever()
+    service.pool.shutdown(wait=True)
+    print("👋 Server stopped")
+
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Weather Monitor Agent")
     parser.add_argument("--test", action="store_true", help="Run in test mode (no email)")
     parser.add_argument("--email-test", action="store_true", help="Send a test email")
+    parser.add_argument("--worker", action="store_true", help="Run as a long-lived worker with an internal scheduler")
+    parser.add_argument("--serve", action="store_true", help="Serve a read-only HTTP API (/weather, /insights, /report)")
+    parser.add_argument("--profile", action="store_true", help="Profile the daily run (CPU and memory) and print a summary")
     
     args = parser.parse_args()
     
     if args.test:
         test_mode()
+    elif args.worker:
+        run_worker()
+    elif args.serve:
+        run_server()
     elif args.email_test:
         print("📧 Weather Monitor Agent - Email Test Mode")
         agent = WeatherMonitorAgent()
@@ -97,4 +216,4 @@ if __name__ == "__main__":
         else:
             print(f"❌ Failed to send test email: {result['error']}")
     else:
-        main() 
\ No newline at end of file
+        main(profile=args.profile) 
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmark suite for the Weather Monitor Agent run path."""
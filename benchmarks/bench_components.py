@@ -0,0 +1,112 @@
+"""
+Micro-benchmarks for the per-city hot path: parsing, formatting, MIME and prompt building.
+"""
+
+from benchmarks.harness import benchmark
+from loadtest.fake_openweather import FakeOpenWeatherServer
+
+
+def sample_payload(location: str = 'San Francisco,US'):
+    """A realistic OpenWeather payload without starting a server."""
+    return FakeOpenWeatherServer.observation(location)
+
+
+@benchmark(name='get_current_weather.parse', number=1000)
+def bench_parse_weather(_):
+    from agent.tools import WeatherTools
+    tools = WeatherTools()
+    payload = sample_payload()
+    yield lambda: tools.parse_weather(payload)
+
+
+def _decoder_names():
+    from agent.decoding import DECODERS
+    return ['response.json'] + list(DECODERS)
+
+
+@benchmark(name='get_current_weather.decode_and_parse', params=_decoder_names(), number=1000)
+def bench_decode_weather(decoder_name):
+    """Decode raw response bytes into an observation: current path vs fast decoders."""
+    import json
+    from agent.decoding import get_weather_decoder
+    from agent.tools import WeatherTools
+    tools = WeatherTools()
+    content = json.dumps(sample_payload()).encode('utf-8')
+    if decoder_name == 'response.json':
+        # What requests' response.json() does: decode text, then json.loads
+        yield lambda: tools.parse_weather(json.loads(content.decode('utf-8')))
+    else:
+        decode = get_weather_decoder(decoder_name)
+        yield lambda: tools.parse_weather(decode(content))
+
+
+@benchmark(name='format_weather_email', number=1000)
+def bench_format_weather_email(_):
+    from agent.tools import WeatherTools
+    tools = WeatherTools()
+    weather = tools.parse_weather(sample_payload())
+    yield lambda: tools.format_weather_email(weather)
+
+
+@benchmark(name='send_weather_email.mime_build', number=200)
+def bench_mime_build(_):
+    from agent.mime import SharedMessageEncoder
+    from agent.report import CityReport
+    from agent.tools import WeatherTools
+    weather = WeatherTools().parse_weather(sample_payload())
+
+    def build():
+        SharedMessageEncoder('sender@example.com').encode(CityReport(weather).message('user@example.com'))
+    yield build
+
+
+def _legacy_mime_bytes(rendered, sender, recipient):
+    """The previous path: MIMEMultipart with MIMEText parts, serialized per message."""
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = rendered['subject']
+    msg.attach(MIMEText(rendered['text'], 'plain'))
+    msg.attach(MIMEText(rendered['html'], 'html'))
+    return msg.as_string().encode('utf-8')
+
+
+@benchmark(name='smtp.encode_100_recipients', params=('legacy', 'email_message', 'shared'), number=5)
+def bench_encode_batch(builder):
+    """Serialize one city's report for 100 recipients, as an SMTP batch does."""
+    from email.message import EmailMessage
+    from email.policy import SMTP
+    from agent.mime import SharedMessageEncoder
+    from agent.templates import template_engine
+    from agent.tools import WeatherTools
+    weather = WeatherTools().parse_weather(sample_payload())
+    rendered = template_engine.render_fragment(weather)
+    sender = 'sender@example.com'
+    messages = [{'to': f"user{i}@example.com", **rendered} for i in range(100)]
+
+    if builder == 'legacy':
+        yield lambda: [_legacy_mime_bytes(m, sender, m['to']) for m in messages]
+    elif builder == 'email_message':
+        def build(m):
+            msg = EmailMessage(policy=SMTP)
+            msg['From'], msg['To'], msg['Subject'] = sender, m['to'], m['subject']
+            msg.set_content(m['text'])
+            msg.add_alternative(m['html'], subtype='html')
+            return msg.as_bytes()
+        yield lambda: [build(m) for m in messages]
+    else:
+        def encode():
+            encoder = SharedMessageEncoder(sender)
+            return [encoder.encode(m) for m in messages]
+        yield encode
+
+
+@benchmark(name='generate_weather_insights.prompt', number=1000)
+def bench_insights_prompt(_):
+    from agent.core import WeatherMonitorAgent
+    from agent.tools import WeatherTools
+    agent = WeatherMonitorAgent()
+    weather = WeatherTools().parse_weather(sample_payload())
+    yield lambda: agent.build_insights_prompt(weather)
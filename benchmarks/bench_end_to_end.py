@@ -0,0 +1,48 @@
+"""
+End-to-end run_daily_weather_check against the local stand-in services.
+"""
+
+from benchmarks.harness import benchmark
+from loadtest.harness import StandInHarness
+
+CITY_COUNTS = (1, 100, 10000)
+
+
+@benchmark(name='run_daily_weather_check', params=CITY_COUNTS,
+           repeat={1: 5, 100: 3, 10000: 1})
+def bench_run_daily_weather_check(city_count):
+    from agent.core import WeatherMonitorAgent
+    from config.settings import settings
+
+    harness = StandInHarness().start()
+    harness.apply_settings(settings)
+    saved = settings.digest_mode, settings.weather_cities
+    # A single city exercises the default path; larger runs use one digest email
+    settings.digest_mode = city_count > 1
+    settings.weather_cities = ';'.join(f"City{i},US" for i in range(city_count))
+    agent = WeatherMonitorAgent()
+    try:
+        yield agent.run_daily_weather_check
+    finally:
+        settings.digest_mode, settings.weather_cities = saved
+        harness.stop()
+
+
+@benchmark(name='generate_batch_insights.50_cities', params=('openai', 'local', 'template'), repeat=3)
+def bench_batch_insights(backend):
+    """Insights for 50 cities per model backend, with 50 ms of model latency per request."""
+    from agent.core import WeatherMonitorAgent
+    from config.settings import settings
+
+    harness = StandInHarness(openai_latency=0.05).start()
+    harness.apply_settings(settings)
+    saved = settings.llm_backend, settings.local_llm_base_url
+    settings.llm_backend = backend
+    settings.local_llm_base_url = harness.openai.api_base_url
+    agent = WeatherMonitorAgent()
+    weather = agent.weather_tools.get_weather_for_cities([f"City{i},US" for i in range(50)])
+    try:
+        yield lambda: agent.generate_batch_insights(weather)
+    finally:
+        settings.llm_backend, settings.local_llm_base_url = saved
+        harness.stop()
@@ -0,0 +1,20 @@
+"""
+Placeholder configuration so benchmarks can import the agent without a real .env.
+Must be imported before anything from config or agent.
+"""
+
+import os
+
+PLACEHOLDER_ENV = {
+    'OPENAI_API_KEY': 'benchmark-key',
+    'OPENWEATHER_API_KEY': 'benchmark-key',
+    'WEATHER_CITY': 'San Francisco',
+    'EMAIL_SENDER': 'sender@example.com',
+    'EMAIL_PASSWORD': 'benchmark-password',
+    'EMAIL_RECIPIENT': 'recipient@example.com',
+    'GCP_PROJECT_ID': 'benchmark-project',
+    'LOG_LEVEL': 'WARNING',
+}
+
+for key, value in PLACEHOLDER_ENV.items():
+    os.environ.setdefault(key, value)
@@ -0,0 +1,135 @@
+"""
+Minimal asv-style benchmark registry, timer and JSON result store.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+class Benchmark:
+    """A named benchmark whose setup is a generator yielding the callable to time.
+
+    Code after the ``yield`` runs as teardown, like a pytest fixture.
+    """
+
+    def __init__(self, name: str, setup: Callable, params: Iterable[Any],
+                 repeat: Union[int, Dict[Any, int]], number: int):
+        self.name = name
+        self.setup = setup
+        self.params = list(params)
+        self.repeat = repeat
+        self.number = number
+
+    def case_name(self, param: Any) -> str:
+        return self.name if param is None else f"{self.name}[{param}]"
+
+    def run(self, param: Any) -> Dict[str, Any]:
+        gen = self.setup(param)
+        fn = next(gen)
+        try:
+            repeat = self.repeat.get(param, 1) if isinstance(self.repeat, dict) else self.repeat
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(self.number):
+                    fn()
+                samples.append((time.perf_counter() - start) / self.number)
+        finally:
+            gen.close()
+        return {
+            'min': min(samples),
+            'median': statistics.median(samples),
+            'mean': statistics.mean(samples),
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            'repeat': repeat,
+            'number': self.number,
+        }
+
+
+REGISTRY: List[Benchmark] = []
+
+
+def benchmark(name: Optional[str] = None, params: Iterable[Any] = (None,),
+              repeat: Union[int, Dict[Any, int]] = 5, number: int = 1):
+    """Register a generator-based benchmark setup function.
+
+    ``repeat`` may be a dict mapping each param to its own repeat count.
+    """
+    def decorator(setup: Callable) -> Callable:
+        REGISTRY.append(Benchmark(name or setup.__name__, setup, params, repeat, number))
+        return setup
+    return decorator
+
+
+def current_commit() -> str:
+    """Short git SHA of the working tree, or 'unknown' outside a checkout."""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(RESULTS_DIR), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_all(selected: Optional[str] = None, params_filter: Optional[Callable[[Benchmark, Any], bool]] = None,
+            quiet: bool = False) -> Dict[str, Any]:
+    """Run registered benchmarks and return a JSON-serializable result document."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for bench in REGISTRY:
+        if selected and selected not in bench.name:
+            continue
+        for param in bench.params:
+            if params_filter and not params_filter(bench, param):
+                continue
+            case = bench.case_name(param)
+            stats = bench.run(param)
+            results[case] = stats
+            if not quiet:
+                print(f"⏱️  {case:<45} min {stats['min'] * 1e3:10.3f} ms   "
+                      f"median {stats['median'] * 1e3:10.3f} ms")
+    return {
+        'commit': current_commit(),
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'benchmarks': results,
+    }
+
+
+def save_results(document: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Write results to benchmarks/results/<commit>.json (or the given path)."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{document['commit']}.json")
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float = 1.10) -> List[Dict[str, Any]]:
+    """Compare median timings; a ratio above threshold is flagged as a regression."""
+    rows = []
+    for case, stats in current['benchmarks'].items():
+        base = baseline['benchmarks'].get(case)
+        if base is None or not base['median']:
+            continue
+        ratio = stats['median'] / base['median']
+        rows.append({
+            'case': case,
+            'baseline': base['median'],
+            'current': stats['median'],
+            'ratio': ratio,
+            'regression': ratio > threshold,
+        })
+    return rows
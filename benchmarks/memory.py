@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Peak memory (max RSS) of each entry point, each measured in a fresh interpreter
+against the stand-in services.
+
+    python -m benchmarks.memory                 # every entry point
+    python -m benchmarks.memory -k cloud        # a subset
+    python -m benchmarks.memory --limit 128     # exit 1 if any exceeds 128 MB
+
+The interpreter itself accounts for roughly 10 MB; a deployed function adds
+the runtime's own framework on top.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.env import PLACEHOLDER_ENV
+from loadtest.harness import StandInHarness
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Each scenario runs after this preamble; a trigger request is built with Request(body)
+PREAMBLE = """
+import json
+class Request:
+    headers = {}
+    def __init__(self, body):
+        self.body = body
+    def get_data(self, cache=True):
+        return json.dumps(self.body).encode()
+    def get_json(self, force=False, silent=False):
+        return self.body
+"""
+
+REPORT = """
+import json, resource, sys
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'max_rss_mb': rss / (1024 * 1024 if sys.platform == 'darwin' else 1024),
+    'modules': len(sys.modules),
+    'openai_loaded': 'openai' in sys.modules,
+}))
+"""
+
+SCENARIOS = {
+    'import.main': "import main",
+    'cloud_function.daily': "import main; assert main.weather_monitor_agent(Request({}))['success']",
+    'cloud_function.email_only': (
+        "import main; assert main.weather_monitor_agent(Request({'stages': ['fetch', 'email']}))['success']"
+    ),
+    'cloud_function.pubsub': (
+        "import main; assert main.weather_monitor_agent_pubsub(Request({'stages': ['fetch', 'email']}), None)['success']"
+    ),
+    'cli.test': "import app; assert 'error' not in app.test_mode()",
+    'cli.daily': "import app; assert app.main()['success']",
+    'serve.report': (
+        "from agent.core import WeatherMonitorAgent\n"
+        "from agent.server import ReportService, create_app\n"
+        "client = create_app(ReportService(WeatherMonitorAgent())).test_client()\n"
+        "assert client.get('/report').status_code == 200"
+    ),
+}
+
+
+def measure(code: str, env) -> dict:
+    """Run code in a fresh interpreter and return its peak memory report."""
+    completed = subprocess.run(
+        [sys.executable, '-c', PREAMBLE + code + '\n' + REPORT],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed')
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Weather Monitor Agent memory benchmarks")
+    parser.add_argument("-k", dest="selected", help="Only run scenarios whose name contains this string")
+    parser.add_argument("--limit", type=float, default=None, help="Fail if any scenario's peak exceeds this many MB")
+    args = parser.parse_args()
+
+    print("🧠 Measuring peak memory per entry point...")
+    failed = False
+    with StandInHarness() as harness:
+        env = dict(os.environ, **PLACEHOLDER_ENV, **harness.env(), COALESCE_WINDOW_SECONDS='0')
+        for name, code in SCENARIOS.items():
+            if args.selected and args.selected not in name:
+                continue
+            try:
+                result = measure(code, env)
+            except RuntimeError as e:
+                print(f"❌ {name:<30} {str(e)}")
+                failed = True
+                continue
+            over = args.limit is not None and result['max_rss_mb'] > args.limit
+            failed = failed or over
+            print(f"{'❌' if over else '✅'} {name:<30} {result['max_rss_mb']:7.1f} MB  "
+                  f"{result['modules']:5d} modules  openai {'loaded' if result['openai_loaded'] else 'not loaded'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
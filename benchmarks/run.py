@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite and store results as JSON for comparison between commits.
+
+    python -m benchmarks.run                          # run everything, save results/<sha>.json
+    python -m benchmarks.run -k format --no-save      # run a subset
+    python -m benchmarks.run --max-cities 100         # skip the 10k-city end-to-end case
+    python -m benchmarks.run --compare benchmarks/results/<sha>.json
+"""
+
+import argparse
+import json
+import sys
+
+import benchmarks.env  # noqa: F401  (placeholder settings before agent imports)
+from benchmarks import bench_components, bench_end_to_end  # noqa: F401  (registers benchmarks)
+from benchmarks.harness import compare_results, run_all, save_results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Weather Monitor Agent benchmarks")
+    parser.add_argument("-k", dest="selected", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--max-cities", type=int, default=None, help="Skip end-to-end cases above this city count")
+    parser.add_argument("--output", help="Write results to this path instead of benchmarks/results/<sha>.json")
+    parser.add_argument("--no-save", action="store_true", help="Do not write a results file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.10, help="Median ratio above which a case is a regression")
+    args = parser.parse_args()
+
+    def params_filter(bench, param):
+        if args.max_cities is None or not isinstance(param, int):
+            return True
+        return param <= args.max_cities
+
+    print("🏁 Running Weather Monitor Agent benchmarks...")
+    document = run_all(args.selected, params_filter)
+
+    if not args.no_save:
+        path = save_results(document, args.output)
+        print(f"💾 Results saved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, document, args.threshold)
+        print(f"\n📊 Compared with {baseline.get('commit', args.compare)}:")
+        for row in rows:
+            marker = "❌" if row['regression'] else "✅"
+            print(f"{marker} {row['case']:<45} {row['ratio']:6.2f}x")
+        if any(row['regression'] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
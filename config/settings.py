@@ -1,46 +1,305 @@
 import os
-from typing import Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import TypeAdapter
 from pydantic_settings import BaseSettings
 
+# Settings each run stage needs; validated only when the stage actually runs.
+# 'location' and 'recipient' apply when a run falls back to the configured
+# city or recipient rather than ones given by a trigger or tenant.
+STAGE_REQUIREMENTS: Dict[str, Tuple[str, ...]] = {
+    'fetch': ('openweather_api_key',),
+    'location': ('weather_city',),
+    'recipient': ('email_recipient',),
+}
+
+# The email stage's requirements depend on the delivery backend
+DELIVERY_REQUIREMENTS: Dict[str, Tuple[str, ...]] = {
+    'smtp': ('email_sender', 'email_password'),
+    'webhook': ('webhook_url',),
+    'file': (),
+}
+
+# Settings TENANT_OVERRIDES and CITY_OVERRIDES may change: the ones read per
+# tenant and city during a run, all for the insights model call
+OVERRIDABLE_SETTINGS: Tuple[str, ...] = (
+    'model_name', 'temperature', 'max_tokens', 'system_prompt', 'llm_timeout_seconds',
+)
+
+# Likewise the insights stage's, on the model backend
+MODEL_REQUIREMENTS: Dict[str, Tuple[str, ...]] = {
+    'openai': ('openai_api_key',),
+    'local': ('local_llm_base_url',),
+    'template': (),
+}
+
 
 class Settings(BaseSettings):
     """Configuration settings for the Weather Monitor Agent."""
     
     # OpenAI Configuration
-    openai_api_key: str
+    openai_api_key: Optional[str] = None
     model_name: str = "gpt-4"
+    openai_base_url: Optional[str] = None  # Override for OpenAI-compatible servers
     temperature: float = 0.7
     max_tokens: int = 1000
+    llm_backend: str = "openai"  # openai, local (OpenAI-compatible server) or template (offline, rule-based)
+    llm_concurrency: int = 4  # Parallel OpenAI requests per insights batch
+    local_llm_base_url: Optional[str] = None  # e.g. http://localhost:8000/v1 (vLLM, llama.cpp, Ollama)
+    local_llm_model: Optional[str] = None  # Replaces model_name for the local backend
+    local_llm_api_key: Optional[str] = None  # Only if the local server checks one
+    local_llm_concurrency: int = 16  # Parallel requests per batch; batching servers merge them
     
     # Weather API Configuration
-    openweather_api_key: str
-    weather_city: str
+    openweather_api_key: Optional[str] = None
+    weather_city: str = ""
     weather_country_code: str = "US"
+    openweather_base_url: str = "http://api.openweathermap.org/data/2.5"
+    weather_cities: str = ""  # Semicolon-separated "City,CC" list for digest mode
+    fetch_concurrency: int = 8
+    json_decoder: str = "auto"  # auto, msgspec, orjson or json
+    http_cache_dir: Optional[str] = None  # e.g. /tmp/weather-cache; unset disables the HTTP cache
+    http_cache_default_ttl: float = 600.0  # Freshness when responses carry no cache headers
+    cache_max_stale_seconds: float = 0.0  # Serve expired weather/insights this long while refreshing in the background
     
     # Email Configuration
-    email_sender: str
-    email_password: str
-    email_recipient: str
+    email_sender: Optional[str] = None
+    email_password: Optional[str] = None
+    email_recipient: Optional[str] = None
     smtp_server: str = "smtp.gmail.com"
     smtp_port: int = 587
+    smtp_use_tls: bool = True
+    delivery_backend: str = "smtp"  # smtp, webhook (JSON POST) or file (JSON lines)
+    webhook_url: Optional[str] = None  # Slack/Teams-style incoming webhook
+    webhook_concurrency: int = 8  # Pooled connections / parallel posts per batch
+    delivery_file: str = "-"  # File backend target; "-" is stdout
+    outbox_path: Optional[str] = None  # e.g. /tmp/outbox.db; queues emails durably instead of sending inline
+    outbox_drain: str = "inline"  # inline (end of each run) or background (worker thread; other runs still drain inline)
+    outbox_batch_size: int = 50  # Messages sent per SMTP session
+    outbox_max_attempts: int = 5
+    outbox_retry_seconds: float = 30.0  # First retry delay, doubled per attempt
+    outbox_interval_seconds: float = 5.0  # Background drain period
+    digest_mode: bool = False
     
     # GCP Configuration
-    gcp_project_id: str
+    gcp_project_id: Optional[str] = None
     gcp_region: str = "us-central1"
     google_application_credentials: Optional[str] = None
     
     # Agent Configuration
     agent_name: str = "Weather Monitor Agent"
     system_prompt: str = "You are a weather monitoring agent that checks daily weather and sends status emails."
+    insights_cache_ttl_seconds: float = 0.0  # Reuse a city's insights across runs for this long; 0 disables
+    prewarm_lead_seconds: float = 0.0  # Pre-warm caches this long before each scheduled send; 0 disables
     
     # Application Configuration
     debug: bool = False
     log_level: str = "INFO"
     
+    # Execution Budget (Cloud Function timeout is 60s)
+    run_budget_seconds: float = 55.0
+    http_timeout_seconds: float = 10.0
+    smtp_timeout_seconds: float = 15.0
+    llm_timeout_seconds: float = 30.0
+    insights_min_seconds: float = 5.0  # Skip insights if less than this remains
+    email_reserve_seconds: float = 10.0  # Kept free for delivery when insights run first
+    
+    # Trigger Coalescing
+    coalesce_window_seconds: float = 300.0  # Duplicate triggers within this window share one run; 0 disables
+    
+    # Sharded Execution
+    shard_processes: int = 0  # >1 spreads large batches across this many processes
+    shard_min_cities: int = 500  # Smaller batches stay in-process
+    
+    # Worker Mode (app.py --worker)
+    worker_interval_seconds: float = 900.0
+    worker_city_intervals: str = ""  # Per-city overrides: "London,GB=300;Tokyo,JP=1800"
+    worker_jitter_seconds: float = 30.0
+    worker_concurrency: int = 4
+    worker_stages: str = "fetch"  # Comma-separated: fetch, insights, email
+    metrics_format: str = "none"  # none, json (Cloud Logging) or prometheus
+    metrics_textfile: Optional[str] = None  # Prometheus textfile collector path
+    
+    # Profiling (also per trigger with {"profile": true})
+    profile_runs: bool = False  # Attach cProfile/tracemalloc summaries to every run result
+    profile_dir: Optional[str] = None  # e.g. /tmp/profiles; also write .prof dumps and text reports
+    profile_top: int = 20  # Functions and allocation sites per summary
+    
+    # HTTP API (app.py --serve)
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 8080
+    serve_workers: int = 8  # Requests computed concurrently; the rest wait
+    serve_timeout_seconds: float = 20.0  # Per-request budget for fetch and insights
+    serve_weather_ttl_seconds: float = 60.0  # Observations reused across requests for this long
+    serve_insights_ttl_seconds: float = 900.0  # Insights reused across requests for this long
+    
+    # Override Layers (JSON objects of setting name -> value; see OVERRIDABLE_SETTINGS)
+    tenant_overrides: Dict[str, Dict[str, Any]] = {}  # {"acme": {"model_name": "gpt-4o"}}, by registry tenant id
+    city_overrides: Dict[str, Dict[str, Any]] = {}  # {"Tokyo,JP": {"model_name": "gpt-4o-mini"}}
+    
+    # Tenant Registry (JSON, YAML or sqlite file); when set, daily runs serve every tenant
+    tenant_registry: Optional[str] = None
+    
+    def city_list(self) -> List[str]:
+        """Locations to report on: weather_cities if set, else the single configured city."""
+        cities = [c.strip() for c in self.weather_cities.split(';') if c.strip()]
+        return cities or [f"{self.weather_city},{self.weather_country_code}"]
+    
+    def missing_for(self, *stages: str) -> List[str]:
+        """Environment variable names the given stages need but are unset."""
+        missing = []
+        for stage in stages:
+            if stage == 'email':
+                names = DELIVERY_REQUIREMENTS.get(self.delivery_backend, ())
+            elif stage == 'insights':
+                names = MODEL_REQUIREMENTS.get(self.llm_backend, ())
+            else:
+                names = STAGE_REQUIREMENTS.get(stage, ())
+            for name in names:
+                if name == 'weather_city' and self.weather_cities:
+                    continue
+                if not getattr(self, name) and name.upper() not in missing:
+                    missing.append(name.upper())
+        return missing
+    
+    def require(self, *stages: str):
+        """Raise ValueError naming any settings the given stages need but lack."""
+        missing = self.missing_for(*stages)
+        if missing:
+            raise ValueError(f"Missing configuration for {', '.join(stages)}: {', '.join(missing)}")
+    
+    def worker_schedule(self) -> Dict[str, float]:
+        """Check interval in seconds for each worker-mode location."""
+        schedule = {city: self.worker_interval_seconds for city in self.city_list()}
+        for entry in self.worker_city_intervals.split(';'):
+            if '=' in entry:
+                city, interval = entry.rsplit('=', 1)
+                schedule[city.strip()] = float(interval)
+        return schedule
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
 
 
-# Global settings instance
-settings = Settings() 
\ No newline at end of file
+def _layer_key(name: str) -> str:
+    return ','.join(part.strip() for part in name.lower().split(','))
+
+
+class SettingsView:
+    """Settings seen through tenant and city override layers.
+    
+    Overridden names come from a merged dict, everything else from the base
+    settings, so a lookup costs one dict probe and later changes to the base
+    stay visible.
+    """
+    
+    def __init__(self, base: Settings, overrides: Dict[str, Any]):
+        self._base = base
+        self._overrides = overrides
+    
+    def __getattr__(self, name: str):
+        if name in self._overrides:
+            return self._overrides[name]
+        attr = getattr(type(self._base), name, None)
+        if callable(attr):
+            # Methods such as city_list() must see the overridden values too
+            return attr.__get__(self)
+        return getattr(self._base, name)
+
+
+class LazySettings:
+    """Global settings proxy that reads and validates .env on first use.
+    
+    Importing the package costs nothing and never fails; missing secrets are
+    reported by Settings.require() for the stages that need them. resolve()
+    returns tenant/city views from a map built once per settings load.
+    """
+    
+    def __init__(self):
+        object.__setattr__(self, '_settings', None)
+        object.__setattr__(self, '_layers', None)
+        object.__setattr__(self, '_views', {})
+        object.__setattr__(self, '_lock', threading.RLock())
+    
+    def _load(self) -> Settings:
+        current = self._settings
+        if current is None:
+            with self._lock:
+                if self._settings is None:
+                    object.__setattr__(self, '_settings', Settings())
+                current = self._settings
+        return current
+    
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+    
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._load(), name, value)
+        if name in ('tenant_overrides', 'city_overrides'):
+            self._reset_layers()
+    
+    def reload(self):
+        """Re-read the environment and .env on next access."""
+        object.__setattr__(self, '_settings', None)
+        self._reset_layers()
+    
+    def _reset_layers(self):
+        object.__setattr__(self, '_layers', None)
+        object.__setattr__(self, '_views', {})
+    
+    def _build_layers(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Validate every override once and index it by (kind, normalized name)."""
+        base = self._load()
+        fields = Settings.model_fields
+        layers = {}
+        for kind, table in (('tenant', base.tenant_overrides), ('city', base.city_overrides)):
+            for name, overrides in table.items():
+                unknown = [key for key in overrides if key not in OVERRIDABLE_SETTINGS]
+                if unknown:
+                    raise ValueError(f"Setting(s) in {kind} override '{name}' cannot be overridden: "
+                                     f"{', '.join(unknown)} (supported: {', '.join(OVERRIDABLE_SETTINGS)})")
+                layers[(kind, _layer_key(name))] = {
+                    key: TypeAdapter(fields[key].annotation).validate_python(value)
+                    for key, value in overrides.items()
+                }
+        return layers
+    
+    def resolve(self, tenant: Optional[str] = None, location: Optional[str] = None):
+        """Settings for a registry tenant id and/or location ("City" or "City,CC").
+        
+        City overrides win over tenant overrides, which win over the base
+        settings. Without any matching layer the base settings are returned.
+        """
+        return self._resolved(tenant, location)[1]
+    
+    def overrides(self, tenant: Optional[str] = None, location: Optional[str] = None) -> Dict[str, Any]:
+        """The merged override values resolve() applies (empty without a matching layer)."""
+        return self._resolved(tenant, location)[0]
+    
+    def _resolved(self, tenant: Optional[str], location: Optional[str]) -> Tuple[Dict[str, Any], Any]:
+        layers = self._layers
+        if layers is None:
+            with self._lock:
+                if self._layers is None:
+                    object.__setattr__(self, '_layers', self._build_layers())
+                layers = self._layers
+        key = (tenant and _layer_key(tenant), location and _layer_key(location))
+        resolved = self._views.get(key)
+        if resolved is None:
+            merged = {}
+            if key[0]:
+                merged.update(layers.get(('tenant', key[0]), {}))
+            if key[1]:
+                # "City,CC" falls back to a bare "City" entry
+                city_layer = layers.get(('city', key[1]))
+                if city_layer is None:
+                    city_layer = layers.get(('city', key[1].split(',')[0]), {})
+                merged.update(city_layer)
+            resolved = (merged, SettingsView(self._load(), merged) if merged else self._load())
+            self._views[key] = resolved
+        return resolved
+
+
+# Global settings instance, loaded on first use
+settings = LazySettings() 
\ No newline at end of file
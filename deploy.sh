@@ -10,8 +10,14 @@ PROJECT_ID="${GCP_PROJECT_ID:-your-project-id}"
 REGION="${GCP_REGION:-us-central1}"
 FUNCTION_NAME="weather-monitor-agent"
 RUNTIME="python311"
-MEMORY="256MB"
+# 128MB covers a full run with insights (see python -m benchmarks.memory); raise it for large digests or sharding
+MEMORY="${MEMORY:-128MB}"
 TIMEOUT="60s"
+# "full" (AI insights) or "slim" (email-only: requirements-slim.txt, no OpenAI SDK)
+DEPLOY_PROFILE="${DEPLOY_PROFILE:-full}"
+SEND_HOUR=8
+# Minutes before the send to fetch observations and generate insights; 0 disables
+PREWARM_LEAD_MINUTES="${PREWARM_LEAD_MINUTES:-0}"
 
 echo "🌤️ Deploying Weather Monitor Agent to GCP..."
 
@@ -31,6 +37,26 @@ fi
 echo "📋 Setting project to: $PROJECT_ID"
 gcloud config set project $PROJECT_ID
 
+SOURCE_DIR="."
+SCHEDULE_BODY='{}'
+if [ "$DEPLOY_PROFILE" = "slim" ]; then
+    # Same code with the slim dependency set; scheduled runs skip the insights stage
+    SOURCE_DIR=$(mktemp -d)
+    trap 'rm -rf "$SOURCE_DIR"' EXIT
+    tar --exclude=.git --exclude=backup --exclude=benchmarks --exclude=loadtest -cf - . | tar -xf - -C "$SOURCE_DIR"
+    cp requirements-slim.txt "$SOURCE_DIR/requirements.txt"
+    SCHEDULE_BODY='{"stages": ["fetch", "email"]}'
+    echo "🪶 Deploying the slim (email-only) profile"
+fi
+
+ENV_VARS="OPENAI_API_KEY=$OPENAI_API_KEY,OPENWEATHER_API_KEY=$OPENWEATHER_API_KEY,EMAIL_SENDER=$EMAIL_SENDER,EMAIL_PASSWORD=$EMAIL_PASSWORD,EMAIL_RECIPIENT=$EMAIL_RECIPIENT,WEATHER_CITY=$WEATHER_CITY,GCP_PROJECT_ID=$PROJECT_ID,GCP_REGION=$REGION"
+EXTRA_FLAGS=""
+if [ "$PREWARM_LEAD_MINUTES" -gt 0 ]; then
+    # Pre-warmed caches live in the instance, so keep one warm for the send
+    ENV_VARS="$ENV_VARS,PREWARM_LEAD_SECONDS=$((PREWARM_LEAD_MINUTES * 60)),INSIGHTS_CACHE_TTL_SECONDS=$((PREWARM_LEAD_MINUTES * 120)),HTTP_CACHE_DIR=/tmp/weather-cache"
+    EXTRA_FLAGS="--min-instances=1"
+fi
+
 # Deploy the Cloud Function
 echo "🚀 Deploying Cloud Function..."
 gcloud functions deploy $FUNCTION_NAME \
@@ -41,22 +67,39 @@ gcloud functions deploy $FUNCTION_NAME \
     --timeout=$TIMEOUT \
     --region=$REGION \
     --entry-point=weather_monitor_agent \
-    --source=. \
+    --source=$SOURCE_DIR \
     --no-gen2 \
-    --set-env-vars="OPENAI_API_KEY=$OPENAI_API_KEY,OPENWEATHER_API_KEY=$OPENWEATHER_API_KEY,EMAIL_SENDER=$EMAIL_SENDER,EMAIL_PASSWORD=$EMAIL_PASSWORD,EMAIL_RECIPIENT=$EMAIL_RECIPIENT,WEATHER_CITY=$WEATHER_CITY,GCP_PROJECT_ID=$PROJECT_ID,GCP_REGION=$REGION"
+    $EXTRA_FLAGS \
+    --set-env-vars="$ENV_VARS"
 
 echo "✅ Cloud Function deployed successfully!"
 
 # Create Cloud Scheduler job for daily execution
 echo "⏰ Creating Cloud Scheduler job..."
 gcloud scheduler jobs create http weather-daily-report \
-    --schedule="0 8 * * *" \
+    --schedule="0 $SEND_HOUR * * *" \
     --uri="$(gcloud functions describe $FUNCTION_NAME --region=$REGION --format='value(httpsTrigger.url)')" \
     --http-method=POST \
+    --headers="Content-Type=application/json" \
+    --message-body="$SCHEDULE_BODY" \
     --location=$REGION
 
+if [ "$PREWARM_LEAD_MINUTES" -gt 0 ]; then
+    PREWARM_AT=$((SEND_HOUR * 60 - PREWARM_LEAD_MINUTES))
+    gcloud scheduler jobs create http weather-daily-prewarm \
+        --schedule="$((PREWARM_AT % 60)) $((PREWARM_AT / 60)) * * *" \
+        --uri="$(gcloud functions describe $FUNCTION_NAME --region=$REGION --format='value(httpsTrigger.url)')" \
+        --http-method=POST \
+        --headers="Content-Type=application/json" \
+        --message-body='{"prewarm": true}' \
+        --location=$REGION
+fi
+
 echo "✅ Cloud Scheduler job created successfully!"
-echo "📅 Weather reports will be sent daily at 8:00 AM"
+echo "📅 Weather reports will be sent daily at $SEND_HOUR:00 AM"
+if [ "$PREWARM_LEAD_MINUTES" -gt 0 ]; then
+    echo "🔥 Caches are pre-warmed $PREWARM_LEAD_MINUTES minutes earlier"
+fi
 
 # Display function URL
 FUNCTION_URL=$(gcloud functions describe $FUNCTION_NAME --region=$REGION --format='value(httpsTrigger.url)')
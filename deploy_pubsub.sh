@@ -11,7 +11,7 @@ REGION="${GCP_REGION:-us-west2}"
 FUNCTION_NAME="weather-monitor-agent-pubsub"
 TOPIC_NAME="weather-agent-trigger"
 RUNTIME="python311"
-MEMORY="256MB"
+MEMORY="${MEMORY:-128MB}"
 TIMEOUT="60s"
 
 echo "🌤️ Deploying Weather Monitor Agent (Pub/Sub) to GCP..."
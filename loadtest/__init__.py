@@ -0,0 +1,8 @@
+"""Offline stand-ins for SMTP, OpenWeather and OpenAI used in load tests and benchmarks."""
+
+from .smtp_sink import SMTPSink
+from .fake_openweather import FakeOpenWeatherServer
+from .fake_openai import FakeOpenAIServer
+from .harness import StandInHarness
+
+__all__ = ['SMTPSink', 'FakeOpenWeatherServer', 'FakeOpenAIServer', 'StandInHarness']
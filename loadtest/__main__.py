@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Run the stand-in services in the foreground and print the matching .env overrides.
+
+    python -m loadtest --weather-latency 0.05 --weather-error-rate 0.01
+"""
+
+import argparse
+import time
+
+from loadtest.harness import StandInHarness
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weather Monitor Agent stand-in services")
+    parser.add_argument("--weather-latency", type=float, default=0.0, help="Seconds added to each OpenWeather response")
+    parser.add_argument("--weather-error-rate", type=float, default=0.0, help="Fraction of OpenWeather requests that fail")
+    parser.add_argument("--openai-latency", type=float, default=0.0, help="Seconds added to each OpenAI response")
+    parser.add_argument("--openai-error-rate", type=float, default=0.0, help="Fraction of OpenAI requests that fail")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="Seconds added to each SMTP DATA command")
+    args = parser.parse_args()
+
+    harness = StandInHarness(
+        weather_latency=args.weather_latency,
+        weather_error_rate=args.weather_error_rate,
+        openai_latency=args.openai_latency,
+        openai_error_rate=args.openai_error_rate,
+        smtp_latency=args.smtp_latency,
+    )
+    with harness:
+        print("🧪 Stand-in services running. Add these to your environment:")
+        for key, value in harness.env().items():
+            print(f"{key}={value}")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"📊 weather={harness.weather.request_count} "
+                      f"openai={harness.openai.request_count} "
+                      f"emails={harness.smtp.message_count}")
+        except KeyboardInterrupt:
+            print("👋 Stopping stand-in services")
+
+
+if __name__ == "__main__":
+    main()
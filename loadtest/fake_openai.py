@@ -0,0 +1,43 @@
+"""
+Fake OpenAI chat-completions API for offline load tests.
+"""
+
+import json
+import time
+import uuid
+from typing import Any, Dict, Tuple
+
+from loadtest.http_stub import StubHTTPServer, StubHandler
+
+
+class FakeOpenAIServer(StubHTTPServer):
+    """Answers POST /v1/chat/completions with a canned assistant message."""
+
+    reply = ("Mild and clear today. Light layers are enough; "
+             "a good day for outdoor activities. No weather alerts.")
+
+    def handle(self, method: str, request: StubHandler) -> Tuple[int, Dict[str, Any]]:
+        if method != 'POST' or request.path.rstrip('/') != '/v1/chat/completions':
+            return 404, {'error': {'message': 'not found', 'type': 'invalid_request_error'}}
+        body = json.loads(request.body or b'{}')
+        prompt_chars = sum(len(m.get('content') or '') for m in body.get('messages', []))
+        return 200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake-model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': self.reply},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_chars // 4,
+                'completion_tokens': len(self.reply) // 4,
+                'total_tokens': (prompt_chars + len(self.reply)) // 4,
+            },
+        }
+
+    @property
+    def api_base_url(self) -> str:
+        return f"{self.base_url}/v1"
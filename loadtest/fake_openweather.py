@@ -0,0 +1,80 @@
+"""
+Fake OpenWeather current-weather API for offline load tests.
+"""
+
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from loadtest.http_stub import StubHTTPServer, StubHandler
+
+
+class FakeOpenWeatherServer(StubHTTPServer):
+    """Serves deterministic /data/2.5/weather payloads derived from the city name.
+
+    Like the real API, observations only change every update_interval
+    seconds. With cache_max_age set, responses carry Cache-Control and an
+    ETag, and matching If-None-Match requests get a 304.
+    """
+
+    path_prefix = '/data/2.5'
+    update_interval = 600
+
+    def __init__(self, *args, cache_max_age: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_max_age = cache_max_age
+        self.not_modified_count = 0
+
+    def handle(self, method: str, request: StubHandler) -> Tuple:
+        url = urlsplit(request.path)
+        if method != 'GET' or url.path != f"{self.path_prefix}/weather":
+            return 404, {'cod': '404', 'message': 'not found'}
+        query = parse_qs(url.query)
+        location = query.get('q', ['Unknown'])[0]
+        if self.cache_max_age is None:
+            return 200, self.observation(location)
+
+        window = int(time.time()) // self.update_interval
+        etag = f'"{zlib.crc32(location.encode("utf-8")):x}-{window}"'
+        headers = {'ETag': etag, 'Cache-Control': f"max-age={self.cache_max_age}"}
+        if request.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.not_modified_count += 1
+            return 304, None, headers
+        return 200, self.observation(location), headers
+
+    @classmethod
+    def observation(cls, location: str) -> Dict[str, Any]:
+        """Build a realistic-looking payload; values are stable per location."""
+        city, _, country = location.partition(',')
+        seed = zlib.crc32(location.encode('utf-8'))
+        now = int(time.time()) // cls.update_interval * cls.update_interval
+        return {
+            'coord': {'lon': (seed % 360) - 180.0, 'lat': (seed % 180) - 90.0},
+            'weather': [{'id': 800, 'main': 'Clear', 'description': 'clear sky', 'icon': '01d'}],
+            'base': 'stations',
+            'main': {
+                'temp': round(5 + (seed % 250) / 10, 2),
+                'feels_like': round(4 + (seed % 250) / 10, 2),
+                'temp_min': round(3 + (seed % 250) / 10, 2),
+                'temp_max': round(7 + (seed % 250) / 10, 2),
+                'pressure': 1000 + seed % 30,
+                'humidity': 30 + seed % 60,
+            },
+            'visibility': 10000,
+            'wind': {'speed': round((seed % 120) / 10, 1), 'deg': seed % 360},
+            'clouds': {'all': seed % 100},
+            'dt': now,
+            'sys': {
+                'type': 2,
+                'id': seed % 100000,
+                'country': country or 'US',
+                'sunrise': now - 6 * 3600,
+                'sunset': now + 6 * 3600,
+            },
+            'timezone': ((seed % 27) - 12) * 3600,
+            'id': seed,
+            'name': city or 'Unknown',
+            'cod': 200,
+        }
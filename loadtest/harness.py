@@ -0,0 +1,77 @@
+"""
+Start every stand-in service together and point Settings at them.
+"""
+
+from typing import Dict, Optional
+
+from loadtest.fake_openai import FakeOpenAIServer
+from loadtest.fake_openweather import FakeOpenWeatherServer
+from loadtest.smtp_sink import SMTPSink
+
+
+class StandInHarness:
+    """Context manager running the SMTP sink and fake OpenWeather/OpenAI servers."""
+
+    def __init__(self, weather_latency: float = 0.0, weather_error_rate: float = 0.0,
+                 openai_latency: float = 0.0, openai_error_rate: float = 0.0,
+                 smtp_latency: float = 0.0, keep_messages: bool = False,
+                 weather_cache_max_age: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.smtp = SMTPSink(latency=smtp_latency, keep_messages=keep_messages)
+        self.weather = FakeOpenWeatherServer(
+            latency=weather_latency, error_rate=weather_error_rate,
+            cache_max_age=weather_cache_max_age, seed=seed
+        )
+        self.openai = FakeOpenAIServer(
+            latency=openai_latency, error_rate=openai_error_rate, seed=seed
+        )
+        self._saved: Dict[str, object] = {}
+
+    def start(self) -> 'StandInHarness':
+        self.smtp.start()
+        self.weather.start()
+        self.openai.start()
+        return self
+
+    def stop(self):
+        self.restore_settings()
+        self.smtp.stop()
+        self.weather.stop()
+        self.openai.stop()
+
+    def __enter__(self) -> 'StandInHarness':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def overrides(self) -> Dict[str, object]:
+        """Settings field values that route all traffic to the stand-ins."""
+        smtp_host, smtp_port = self.smtp.address
+        return {
+            'openweather_base_url': f"{self.weather.base_url}{self.weather.path_prefix}",
+            'openai_base_url': self.openai.api_base_url,
+            'smtp_server': smtp_host,
+            'smtp_port': smtp_port,
+            'smtp_use_tls': False,
+        }
+
+    def env(self) -> Dict[str, str]:
+        """Environment variables equivalent to overrides(), for subprocesses."""
+        return {key.upper(): str(value).lower() if isinstance(value, bool) else str(value)
+                for key, value in self.overrides().items()}
+
+    def apply_settings(self, settings):
+        """Point an already-loaded Settings instance at the stand-ins."""
+        for key, value in self.overrides().items():
+            self._saved.setdefault(key, getattr(settings, key))
+            setattr(settings, key, value)
+        self._settings = settings
+
+    def restore_settings(self):
+        settings = getattr(self, '_settings', None)
+        if settings is not None:
+            for key, value in self._saved.items():
+                setattr(settings, key, value)
+            self._saved = {}
+            self._settings = None
@@ -0,0 +1,103 @@
+"""
+Shared plumbing for the fake HTTP services used in load tests.
+"""
+
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler that delegates to the owning StubHTTPServer."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep load-test output quiet
+        pass
+
+    def send_json(self, status: int, payload: Optional[Dict[str, Any]],
+                  headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def dispatch(self, method: str):
+        stub = self.server.stub
+        stub.count_request()
+        # Always drain the body so keep-alive connections stay in sync
+        self.body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.error_rate and stub.random.random() < stub.error_rate:
+            self.send_json(stub.error_status, {'cod': stub.error_status, 'message': 'injected failure'})
+            return
+        self.send_json(*stub.handle(method, self))
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+
+class _QuietThreadingHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients timing out mid-response are expected under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubHTTPServer:
+    """Threaded HTTP server with configurable latency and error injection."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 500, seed: Optional[int] = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = _QuietThreadingHTTPServer((host, port), StubHandler)
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.address
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def handle(self, method: str, request: StubHandler) -> Tuple:
+        """Return (status, json payload[, headers]) for a request. Override in subclasses."""
+        raise NotImplementedError
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,117 @@
+"""
+Local SMTP sink for load testing.
+Accepts any AUTH, counts delivered messages and optionally keeps them.
+"""
+
+import socketserver
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Minimal SMTP dialogue: EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    disable_nagle_algorithm = True
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        sink = self.server.sink
+        self.reply("220 weather-monitor smtp sink ready")
+        sender: Optional[str] = None
+        recipients: List[str] = []
+
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = line[:4].upper()
+
+            if verb == 'EHLO':
+                self.wfile.write(b"250-weather-monitor\r\n250-8BITMIME\r\n250 AUTH PLAIN LOGIN\r\n")
+            elif verb == 'HELO':
+                self.reply("250 weather-monitor")
+            elif verb == 'AUTH':
+                parts = line.split()
+                if len(parts) == 2 and parts[1].upper() == 'LOGIN':
+                    # Username and password continuation lines
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    self.reply("334 ")
+                    self.rfile.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == 'MAIL':
+                sender = line.split(':', 1)[1].strip()
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(line.split(':', 1)[1].strip())
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                chunks = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if not data_line or data_line in (b".\r\n", b".\n"):
+                        break
+                    chunks.append(data_line)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink.record(sender, recipients, b''.join(chunks))
+                self.reply("250 OK queued")
+            elif verb == 'RSET':
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class _ThreadingSMTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """Threaded SMTP server that swallows mail for offline load tests."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0,
+                 latency: float = 0.0, keep_messages: bool = False):
+        self.latency = latency
+        self.keep_messages = keep_messages
+        self.messages: List[Tuple[str, List[str], bytes]] = []
+        self.message_count = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingSMTPServer((host, port), _SMTPHandler)
+        self._server.sink = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def record(self, sender: Optional[str], recipients: List[str], data: bytes):
+        """Record one delivered message."""
+        with self._lock:
+            self.message_count += 1
+            if self.keep_messages:
+                self.messages.append((sender, list(recipients), data))
+
+    def start(self) -> 'SMTPSink':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -3,10 +3,12 @@ GCP Cloud Function entry point for Weather Monitor Agent
 This function will be triggered by Cloud Scheduler for daily weather reports.
 """
 
+import base64
 import os
 import sys
 import logging
 import json
+import threading
 from datetime import datetime
 from dotenv import load_dotenv
 # Load environment variables
@@ -15,13 +17,248 @@ load_dotenv()
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agent.core import WeatherMonitorAgent
+from agent.core import WeatherMonitorAgent, RUN_STAGES
+from agent.coalesce import SingleFlight, coalescing_key
+from agent.sharding import shard_cities
+from config.settings import settings
+
+# Reused across invocations while the function instance stays warm
+_agent = None
+_agent_lock = threading.Lock()
+_coalescers = None
+
+
+def get_agent() -> WeatherMonitorAgent:
+    """Return the process-wide agent, creating it on first use."""
+    global _agent
+    with _agent_lock:
+        if _agent is None:
+            _agent = WeatherMonitorAgent()
+        return _agent
+
+
+def get_coalescers():
+    """
+    Return the process-wide (runs, redeliveries) coalescers, creating them on first use.
+    
+    Settings are read here rather than at import, so importing main needs
+    no configuration. Redeliveries (same idempotency key) replay the
+    (result, shared) pair of the first delivery.
+    """
+    global _coalescers
+    with _agent_lock:
+        if _coalescers is None:
+            window = settings.coalesce_window_seconds
+            _coalescers = (SingleFlight(window, keep_result=lambda r: r.get('success')),
+                           SingleFlight(window, keep_result=lambda r: r[0].get('success')))
+        return _coalescers
+
+
+def parse_run_request(payload):
+    """
+    Extract optional per-message run parameters from a trigger payload.
+    
+    Recognized keys are "cities" (["City,CC", ...]), "recipients"
+    (["a@example.com", ...]) and "stages" (any of "fetch", "insights",
+    "email"). "shard_index" and "shard_count" restrict the cities to one
+    stable-hash shard so a large list can be split across invocations.
+    "tenants" (["tenant-id", ...] or "*" for all) runs registry tenants,
+    with cities and recipients narrowing them. "prewarm": true fills the
+    caches ahead of the daily send (optionally for "cities") and sends
+    nothing. Returns None when none are present, meaning the default daily
+    run.
+    
+    Raises:
+        ValueError: If the payload is not an object, a parameter is not a
+            list of strings, names an unknown stage, or the shard fields are
+            inconsistent
+    """
+    if not isinstance(payload, dict):
+        raise ValueError(f"Run parameters must be a JSON object, not {type(payload).__name__}")
+    run_request = {}
+    if payload.get('prewarm'):
+        if set(payload) & {'recipients', 'stages', 'tenants', 'shard_index', 'shard_count'}:
+            raise ValueError("'prewarm' only accepts 'cities'")
+    
+    for field in ('cities', 'recipients', 'stages'):
+        value = payload.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, list) or not all(isinstance(v, str) and v.strip() for v in value):
+            raise ValueError(f"'{field}' must be a list of non-empty strings")
+        run_request[field] = [v.strip() for v in value]
+    
+    unknown = set(run_request.get('stages', [])) - set(RUN_STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    
+    if payload.get('prewarm'):
+        run_request['prewarm'] = True
+        return run_request
+    
+    tenants = payload.get('tenants')
+    if tenants is not None:
+        if tenants != '*' and not (isinstance(tenants, list) and tenants
+                                   and all(isinstance(t, str) and t.strip() for t in tenants)):
+            raise ValueError("'tenants' must be \"*\" or a list of non-empty tenant ids")
+        if payload.get('shard_index') is not None or payload.get('shard_count') is not None:
+            raise ValueError("'tenants' cannot be combined with 'shard_index'/'shard_count'")
+        run_request['tenant_ids'] = None if tenants == '*' else [t.strip() for t in tenants]
+        return run_request
+    
+    shard_index, shard_count = payload.get('shard_index'), payload.get('shard_count')
+    if shard_index is not None or shard_count is not None:
+        if not (isinstance(shard_index, int) and isinstance(shard_count, int)
+                and 0 <= shard_index < shard_count):
+            raise ValueError("'shard_index' and 'shard_count' must be integers with 0 <= shard_index < shard_count")
+        cities = run_request.get('cities') or settings.city_list()
+        run_request['cities'] = shard_cities(cities, shard_count, shard_index)[0]
+        if not run_request['cities']:
+            raise ValueError(f"Shard {shard_index} of {shard_count} has no cities")
+    return run_request or None
+
+
+def run_coalesced(idempotency_key=None, run_request=None, profile=False):
+    """
+    Run the weather check, sharing one execution among duplicate triggers.
+    
+    Without a run_request this is the daily check; otherwise the message's
+    cities, recipients and stages execute as one batch. Triggers with the
+    same cities, recipients and stages within the coalescing window of the
+    previous run finishing receive the result of a single run. An
+    idempotency key (e.g. a Pub/Sub event ID) additionally replays the
+    result to redeliveries of the same trigger.
+    Profiled runs (profile=True) always execute on their own.
+    """
+    agent = get_agent()
+    if run_request and run_request.get('prewarm'):
+        cities = run_request.get('cities')
+        run = lambda: agent.prewarm(cities, profile=profile)
+        cities = cities or settings.city_list()
+        scope = 'prewarm'
+    elif run_request and 'tenant_ids' in run_request:
+        run = lambda: agent.run_tenants(**run_request, profile=profile)
+        tenant_ids = run_request['tenant_ids']
+        cities = run_request.get('cities') or []
+        scope = ('tenants', frozenset(tenant_ids) if tenant_ids is not None else '*',
+                 frozenset(run_request.get('recipients') or []),
+                 frozenset(run_request.get('stages') or RUN_STAGES))
+    elif run_request:
+        run = lambda: agent.run_batch(**run_request, profile=profile)
+        cities = run_request.get('cities') or settings.city_list()
+        scope = (frozenset(run_request.get('recipients') or [settings.email_recipient]),
+                 frozenset(run_request.get('stages') or RUN_STAGES))
+    else:
+        run = lambda: agent.run_daily_weather_check(profile=profile)
+        cities = settings.city_list()
+        scope = 'daily'
+    
+    if profile or settings.coalesce_window_seconds <= 0:
+        return run()
+    
+    runs, redeliveries = get_coalescers()
+    key = coalescing_key(cities, scope=scope)
+    coalesced = lambda: runs.do(key, run)
+    if idempotency_key:
+        (result, shared), redelivered = redeliveries.do(('idempotency', idempotency_key), coalesced)
+        shared = shared or redelivered
+    else:
+        result, shared = coalesced()
+    return dict(result, coalesced=shared)
+
+
+def read_json_body(request):
+    """
+    The JSON body of an HTTP trigger, {} when there is none.
+    
+    The body is parsed whatever its Content-Type, since Cloud Scheduler
+    posts application/octet-stream by default.
+    
+    Raises:
+        ValueError: If a body is present but is not valid JSON
+    """
+    if request is None or not request.get_data(cache=True):
+        return {}
+    payload = request.get_json(force=True, silent=True)
+    if payload is None:
+        raise ValueError("Request body is not valid JSON")
+    return payload
+
+
+def invalid_run_parameters(logger, error, **fields):
+    """Log and build the response for a trigger whose run parameters were rejected; nothing runs."""
+    logger.error(f"❌ Invalid run parameters: {str(error)}")
+    return {
+        'success': False,
+        'error': f"Invalid run parameters: {str(error)}",
+        **fields,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def log_run_result(logger, result):
+    """Log the outcome of a daily or batch run."""
+    if result.get('coalesced'):
+        logger.info("🔁 Duplicate trigger: returning the shared result of a coalesced run")
+    if 'profile' in result:
+        log_profile(logger, result['profile'])
+    
+    if result['success']:
+        logger.info("✅ Weather check completed successfully!")
+        if result.get('prewarm'):
+            logger.info(f"🔥 Pre-warmed {len(result['weather_data'])} locations "
+                        f"(stages: {', '.join(result['stages'])})")
+            return
+        if 'tenants' in result:
+            sent = sum(len(t['email_results']) for t in result['tenants'].values())
+            logger.info(f"🏢 Served {len(result['tenants'])} tenants: {len(result['weather_data'])} locations, "
+                        f"{sent} emails (stages: {', '.join(result['stages'])})")
+            return
+        if 'email_results' in result:
+            # Batch run: weather_data is keyed by location
+            logger.info(f"📍 Batch covered {len(result['weather_data'])} locations "
+                        f"(stages: {', '.join(result['stages'])})")
+            for recipient, email_result in result['email_results'].items():
+                logger.info(f"📧 {email_result['message']}")
+            return
+        logger.info(f"📧 Email sent to: {result['email_result']['message']}")
+        if isinstance(result['weather_data'], list):
+            logger.info(f"📍 Digest covered {len(result['weather_data'])} locations")
+        else:
+            logger.info(f"📍 Location: {result['weather_data']['city']}, {result['weather_data']['country']}")
+            logger.info(f"🌡️ Temperature: {result['weather_data']['temperature']}°C")
+            if result.get('ai_insights_error'):
+                logger.warning(f"🤖 {result['ai_insights_error']}")
+    else:
+        logger.error("❌ Weather check failed!")
+        if 'error' in result:
+            logger.error(f"Error: {result['error']}")
+        if 'email_result' in result and 'error' in result['email_result']:
+            logger.error(f"Email Error: {result['email_result']['error']}")
+        for recipient, email_result in result.get('email_results', {}).items():
+            if 'error' in email_result:
+                logger.error(f"Email Error ({recipient}): {email_result['error']}")
+
+
+def log_profile(logger, profile, top=5):
+    """Log the hottest functions and peak memory of a profiled run."""
+    if profile['memory']:
+        logger.info(f"🔬 Profile: peak traced memory {profile['memory']['peak_kb']} KiB")
+    for row in profile['cpu'][:top]:
+        logger.info(f"🔬 {row['cumulative_ms']:>10.1f} ms cumulative  {row['calls']:>6} calls  {row['function']}")
+    for path in profile.get('artifacts', []):
+        logger.info(f"🔬 Wrote {path}")
+
+
 def weather_monitor_agent(request):
     """
     Cloud Function entry point for weather monitoring.
     
     Args:
-        request: Flask request object (unused for scheduled functions)
+        request: Flask request object; the optional JSON body accepts
+            "cities", "recipients" and "stages" (see parse_run_request), an
+            "idempotency_key" or Idempotency-Key header deduplicates retried
+            triggers, and "profile": true attaches a CPU/memory profile
     
     Returns:
         dict: Result of the weather check operation
@@ -32,25 +269,21 @@ def weather_monitor_agent(request):
     
     logger.info("🌤️ Weather Monitor Agent triggered by Cloud Scheduler")
     
+    # Reject unreadable bodies and bad run parameters rather than falling back to the default run
     try:
-        # Initialize the agent
-        agent = WeatherMonitorAgent()
-        
-        # Run the daily weather check
-        result = agent.run_daily_weather_check()
-        
-        if result['success']:
-            logger.info("✅ Weather check completed successfully!")
-            logger.info(f"📧 Email sent to: {result['email_result']['message']}")
-            logger.info(f"📍 Location: {result['weather_data']['city']}, {result['weather_data']['country']}")
-            logger.info(f"🌡️ Temperature: {result['weather_data']['temperature']}°C")
-        else:
-            logger.error("❌ Weather check failed!")
-            if 'error' in result:
-                logger.error(f"Error: {result['error']}")
-            if 'email_result' in result and 'error' in result['email_result']:
-                logger.error(f"Email Error: {result['email_result']['error']}")
+        payload = read_json_body(request)
+        run_request = parse_run_request(payload)
+    except ValueError as e:
+        return invalid_run_parameters(logger, e)
+    
+    try:
+        idempotency_key = payload.get('idempotency_key') or (
+            request.headers.get('Idempotency-Key') if request is not None else None
+        )
         
+        # Run the daily weather check, or the batch described by the payload
+        result = run_coalesced(idempotency_key, run_request, bool(payload.get('profile')))
+        log_run_result(logger, result)
         return result
         
     except Exception as e:
@@ -67,7 +300,10 @@ def weather_monitor_agent_pubsub(event, context):
     Cloud Function entry point for weather monitoring triggered by Pub/Sub messages.
     
     Args:
-        event: Pub/Sub event containing the message
+        event: Pub/Sub event; deployed (gen1) functions get a dict whose
+            "data" is the base64-encoded JSON message. Besides "triggered_by"
+            and "message" the message may carry "cities", "recipients" and "stages"
+            (see parse_run_request) and "profile": true
         context: Cloud Function context
     
     Returns:
@@ -79,50 +315,50 @@ def weather_monitor_agent_pubsub(event, context):
     
     # Parse the Pub/Sub message
     try:
-        if hasattr(event, 'data'):
-            # Pub/Sub event
+        if isinstance(event, dict):
+            # Deployed (gen1) Pub/Sub event: the message body is base64 in event['data']
+            message_data = base64.b64decode(event.get('data') or b'').decode('utf-8')
+            message_json = json.loads(message_data) if message_data.strip() else {}
+        elif hasattr(event, 'data'):
+            # Pub/Sub event object (local testing)
             message_data = event.data.decode('utf-8')
-            message_json = json.loads(message_data)
+            message_json = json.loads(message_data) if message_data.strip() else {}
         else:
             # Direct HTTP call
-            message_json = event.get_json() if hasattr(event, 'get_json') else {}
+            message_json = read_json_body(event) if hasattr(event, 'get_json') else {}
+        # Non-object JSON is rejected below by parse_run_request
+        fields = message_json if isinstance(message_json, dict) else {}
         
-        trigger_source = message_json.get('triggered_by', 'pubsub')
-        custom_message = message_json.get('message', '')
+        trigger_source = fields.get('triggered_by', 'pubsub')
+        custom_message = fields.get('message', '')
+        # Redelivered Pub/Sub messages keep their event ID
+        idempotency_key = fields.get('idempotency_key') or getattr(context, 'event_id', None)
         
         logger.info(f"🌤️ Weather Monitor Agent triggered by {trigger_source}")
         if custom_message:
             logger.info(f"📝 Custom message: {custom_message}")
             
     except Exception as e:
-        logger.warning(f"Could not parse message: {e}")
-        trigger_source = 'unknown'
-        custom_message = ''
+        # An unreadable message must not turn into the default run
+        return invalid_run_parameters(logger, f"Could not parse message: {str(e)}",
+                                      trigger_source='unknown', custom_message='')
     
+    # Reject bad run parameters rather than falling back to the default run
     try:
-        # Initialize the agent
-        agent = WeatherMonitorAgent()
-        
-        # Run the daily weather check
-        result = agent.run_daily_weather_check()
+        run_request = parse_run_request(message_json)
+    except ValueError as e:
+        return invalid_run_parameters(logger, e, trigger_source=trigger_source, custom_message=custom_message)
+    
+    try:
+        # Run the daily weather check, or the batch described by the message
+        result = run_coalesced(idempotency_key, run_request, bool(message_json.get('profile')))
         
         # Add trigger information to result
         result['trigger_source'] = trigger_source
         result['custom_message'] = custom_message
         result['triggered_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        if result['success']:
-            logger.info("✅ Weather check completed successfully!")
-            logger.info(f"📧 Email sent to: {result['email_result']['message']}")
-            logger.info(f"📍 Location: {result['weather_data']['city']}, {result['weather_data']['country']}")
-            logger.info(f"🌡️ Temperature: {result['weather_data']['temperature']}°C")
-        else:
-            logger.error("❌ Weather check failed!")
-            if 'error' in result:
-                logger.error(f"Error: {result['error']}")
-            if 'email_result' in result and 'error' in result['email_result']:
-                logger.error(f"Email Error: {result['email_result']['error']}")
-        
+        log_run_result(logger, result)
         return result
         
     except Exception as e: